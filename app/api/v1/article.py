@@ -4,12 +4,11 @@ from fastapi import APIRouter, Depends, Query
 from tortoise.expressions import Q
 
 from app.core.ctx import CTX_USER_ID
-from app.services.user import user_controller
+from app.core.dependency import get_current_principal
 from app.services.article import article_controller
-from app.sqlmodel.admin import Role
 from app.schemas.base import Success, SuccessExtra
 from app.schemas.article import ArticleSearch, ArticleUpdate
-from app.core.utils import model_to_dict
+from app.core.utils import model_to_dict, values_to_dict
 
 router = APIRouter()
 
@@ -25,9 +24,7 @@ async def get_articles(query: ArticleSearch = Depends()):
     if query.body:
         q &= Q(body__contains=query.body)
     if query.author_name:
-        author = await user_controller.get_by_username(user_name=query.author_name)
-        if author:
-            q &= Q(author_id=author.id)
+        q &= Q(author__username=query.author_name)
     if query.time_range:
         start_ts, end_ts = map(lambda x: int(x) / 1000, query.time_range.split(","))
         q &= Q(create_time__gte=datetime.fromtimestamp(start_ts),
@@ -39,26 +36,32 @@ async def get_articles(query: ArticleSearch = Depends()):
         query.size = 10
 
     user_id = CTX_USER_ID.get()
-    user_obj = await user_controller.get(id=user_id)
-    user_roles: list[Role] = await user_obj.roles
-    role_codes = [r.role_code for r in user_roles]
+    principal = await get_current_principal()
+    role_codes = principal.role_codes if principal else []
 
     if "R_SUPER" not in role_codes and "R_ADMIN" not in role_codes:
         # 非管理员只能查看自己写的文章
         q &= Q(author_id=user_id)
 
+    # 只查询列表需要的字段, 作者名随同一查询关联取回, 正文默认不返回
+    values = {field: field for field in ("id", "slug", "title", "description", "created_at", "updated_at")}
+    if query.with_body:
+        values["body"] = "body"
+    values["author_name"] = "author__username"
+
     total, articles = await article_controller.list(
         page=query.current,
         page_size=query.size,
         search=q,
-        order=["-id"]
+        order=["-id"],
+        values=values,
+        count="cached",
     )
 
     records = []
     for article in articles:
-        data = await model_to_dict(article, exclude_fields=["author_id"])
-        author = await article.author  # type: ignore
-        data["authorName"] = author.username if author else "Unknown"
+        data = values_to_dict(article)
+        data["authorName"] = data["authorName"] or "Unknown"
         records.append(data)
 
     return SuccessExtra(data={"records": records}, total=total, current=query.current, size=query.size)
@@ -66,10 +69,9 @@ async def get_articles(query: ArticleSearch = Depends()):
 
 @router.get("/articles/{article_id}", summary="查看文章详情")
 async def get_article_by_id(article_id: int):
-    article = await article_controller.get(id=article_id)
+    article = await article_controller.model.filter(id=article_id).select_related("author").get()
     data = await model_to_dict(article, exclude_fields=["author_id"])
-    author = await article.author  # type: ignore
-    data["authorName"] = author.username if author else "Unknown"
+    data["authorName"] = article.author.username if article.author else "Unknown"
     return Success(data=data)
 
 
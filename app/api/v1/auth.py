@@ -4,11 +4,12 @@ from fastapi import APIRouter
 from fastapi import Form,HTTPException
 from fastapi.responses import JSONResponse
 
+from app.core.bgtask import BgTasks
 from app.core.utils import insert_log
 from app.services.user import user_controller
 from app.core.ctx import CTX_USER_ID
-from app.core.dependency import DependAuth, check_token
-from app.sqlmodel.admin import User, Role, Button, StatusType
+from app.core.dependency import DependAuth, check_token, get_current_principal, get_current_user
+from app.sqlmodel.admin import User, StatusType
 from app.sqlmodel.base import LogDetailType, LogType
 from app.schemas.base import Fail, Success
 from app.schemas.login import CredentialsSchema, JWTOut, JWTPayload
@@ -145,25 +146,22 @@ async def refresh_token(jwt_token: JWTOut):
 @router.get("/getUserInfo", summary="查看用户信息", dependencies=[DependAuth])
 async def get_user_info():
     user_id = CTX_USER_ID.get()
-    user_obj: User = await user_controller.get(id=user_id)
+    user_obj: User | None = await get_current_user()
     if user_obj is None:
         return Fail(code="4000", msg="用户不存在。")
     # data = await user_obj.to_dict(exclude_fields=["password"])
     data = await model_to_dict(user_obj,exclude_fields=["password"])
 
-    user_roles: list[Role] = await user_obj.roles
-    user_role_codes = [user_role.role_code for user_role in user_roles]
-
-    user_role_button_codes = [b.button_code for b in await Button.all()] if "R_SUPER" in user_role_codes else [b.button_code for user_role in user_roles for b in await user_role.buttons]
-
-    user_role_button_codes = list(set(user_role_button_codes))
+    principal = await get_current_principal()
+    user_role_codes = principal.role_codes if principal else []
+    user_role_button_codes = principal.button_codes if principal else []
 
     data.update({
         "user_id": user_id,
         "roles": user_role_codes,
         "buttons": user_role_button_codes
     })
-    await insert_log(log_type=LogType.UserLog, log_detail_type=LogDetailType.UserLoginGetUserInfo, by_user_id=user_obj.id)
+    await BgTasks.add_task(insert_log, log_type=LogType.UserLog, log_detail_type=LogDetailType.UserLoginGetUserInfo, by_user_id=user_obj.id)
     return Success(data=data)
 
 
@@ -1,5 +1,8 @@
 from fastapi import APIRouter
 
+from app.core.dependency import DependAuth, token_cache
+from app.core.security import password_hasher
+
 # 创建一个APIRouter实例
 router = APIRouter()
 
@@ -7,4 +10,8 @@ router = APIRouter()
 async def health_check():
 
     return {"status": "healthy"}
-    
\ No newline at end of file
+
+
+@router.get("/metrics", dependencies=[DependAuth])
+async def metrics():
+    return {"tokenCache": token_cache.stats(), "passwordHasher": password_hasher.stats()}
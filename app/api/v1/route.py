@@ -1,73 +1,70 @@
 from typing import Any,List,Dict
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from app.services.menu import menu_controller
-from app.core.ctx import CTX_USER_ID
-from app.core.dependency import DependAuth
-from app.sqlmodel.admin import Menu, Role, User
+from app.core.dependency import DependAuth, get_current_principal
+from app.sqlmodel.admin import Menu
 from app.schemas.base import Success
-from app.core.utils import model_to_dict
+from app.core.response_cache import ResponseCache
+from app.core.utils import build_tree
+from app.settings.config import APP_SETTINGS
 
 router = APIRouter()
 
+# 路由只随菜单、角色变更, 按角色集合缓存编码后的响应
+route_cache = ResponseCache(max_size=APP_SETTINGS.ROUTE_CACHE_SIZE, entities=("menu", "role"))
+
+
+def route_node(menu: Menu) -> dict:
+    """单个菜单转为前端路由"""
+    menu_dict = {
+        "name": menu.route_name,
+        "path": menu.route_path,
+        "component": menu.component,
+        "meta": {
+            "title": menu.menu_name,
+            "i18nKey": menu.i18n_key,
+            "order": menu.order,
+            # "roles": role_codes,  # todo roles
+            "keepAlive": menu.keep_alive,
+            "icon": menu.icon,
+            "iconType": menu.icon_type,
+            "href": menu.href,
+            "activeMenu": menu.active_menu,
+            "multiTab": menu.multi_tab,
+            "fixedIndexInTab": menu.fixed_index_in_tab,
+        }
+    }
+    if menu.redirect:
+        menu_dict["redirect"] = menu.redirect
+    if menu.component:
+        menu_dict["meta"]["layout"] = menu.component.split("$", maxsplit=1)[0]
+    if menu.hide_in_menu and not menu.constant:
+        menu_dict["meta"]["hideInMenu"] = menu.hide_in_menu
+    return menu_dict
+
 
-async def build_route_tree(menus: list[Menu], parent_id: int = 0, simple: bool = False) -> list[dict]:
+def build_route_tree(menus: list[Menu], parent_id: int = 0) -> list[dict]:
     """
-    递归生成路由树
+    生成路由树, 不涉及IO, 同步执行
     :param menus:
     :param parent_id:
-    :param simple: 是否简化返回数据
     :return:
     """
-    tree :List[Dict[str, Any]]= []
-    for menu in menus:
-        # 预加载关联的Role对象
-        # await menu.fetch_related('role_menus')
-        # menu_roles: list[Role] = menu.role_menus  # type: ignore
-        # role_codes = [role.role_code for role in menu_roles]
-
-        if menu.parent_id == parent_id:
-            children = await build_route_tree(menus, menu.id, simple)
-            if simple:
-                menu_dict = {
-                    "name": menu.route_name,
-                    "path": menu.route_path,
-                    "component": menu.component,
-                    "meta": {
-                        "title": menu.menu_name,
-                        "i18nKey": menu.i18n_key,
-                        "order": menu.order,
-                        # "roles": role_codes,  # todo roles
-                        "keepAlive": menu.keep_alive,
-                        "icon": menu.icon,
-                        "iconType": menu.icon_type,
-                        "href": menu.href,
-                        "activeMenu": menu.active_menu,
-                        "multiTab": menu.multi_tab,
-                        "fixedIndexInTab": menu.fixed_index_in_tab,
-                    }
-                }
-                if menu.redirect:
-                    menu_dict["redirect"] = menu.redirect
-                if menu.component:
-                    menu_dict["meta"]["layout"] = menu.component.split("$", maxsplit=1)[0]
-                if menu.hide_in_menu and not menu.constant:
-                    menu_dict["meta"]["hideInMenu"] = menu.hide_in_menu
-            else:
-                # menu_dict = await menu.to_dict()
-                menu_dict = await model_to_dict(menu)
-            if children:
-                menu_dict["children"] = children
-            tree.append(menu_dict)
-    return tree
+    return build_tree(menus, route_node, parent_id)
 
 
 @router.get("/constant-routes", summary="查看常量路由(公共路由)")
-async def check_constant_routes():
+async def check_constant_routes(request: Request):
     """
     查看常量路由
     :return:
     """
+    cached = await route_cache.get("constant", build_constant_routes)
+    return cached.to_response(request)
+
+
+async def build_constant_routes() -> list[dict]:
     data :List[Dict[str, Any]]= []
     menu_objs = await Menu.filter(constant=True, hide_in_menu=True)
     for menu_obj in menu_objs:
@@ -87,52 +84,40 @@ async def check_constant_routes():
             route_data["props"] = True
 
         data.append(route_data)
-
-    return Success(data=data)
+    return data
 
 
 @router.get("/user-routes", summary="查看用户路由菜单", dependencies=[DependAuth])
-async def check_user_routes():
+async def check_user_routes(request: Request):
     """
     查看用户路由菜单, 超级管理员返回所有菜单
     :return:
     """
-    user_id = CTX_USER_ID.get()
-    user_obj = await User.get(id=user_id)
-    user_roles: list[Role] = await user_obj.roles
-
-    is_super = False
-    role_home = "home"
-    for user_role in user_roles:
-        if user_role.role_code == "R_SUPER":
-            is_super = True
-        if user_role.role_home:
-            role_home = user_role.role_home
+    principal = await get_current_principal()
+    is_super = principal.is_super if principal else False
+    role_ids = tuple(sorted(principal.role_ids)) if principal else ()
+    role_home = principal.role_home if principal else "home"
 
+    key = ("user", is_super, () if is_super else role_ids, role_home)
+    cached = await route_cache.get(key, lambda: build_user_routes(is_super, list(role_ids), role_home))
+    return cached.to_response(request)
+
+
+async def build_user_routes(is_super: bool, role_ids: list[int], role_home: str) -> dict:
     if is_super:
         role_routes: list[Menu] = await Menu.filter(constant=False)  # todo 处理隐藏菜单是否需要返回
     else:
         role_routes: list[Menu] = []
-        for user_role in user_roles:
-            user_role_routes: list[Menu] = await user_role.menus  # type: ignore
-            for user_role_route in user_role_routes:
-                if not user_role_route.constant or user_role_route.hide_in_menu:
-                    role_routes.append(user_role_route)
-
-        menu_objs = role_routes.copy()
-        while len(menu_objs) > 0:
-            menu = menu_objs.pop()
-            if menu.parent_id != 0:
-                menu = await Menu.get(id=menu.parent_id)
-                menu_objs.append(menu)
-            else:
-                role_routes.append(menu)
-
-    role_routes = list(set(role_routes))  # 去重
-    # 递归生成菜单
-    menu_tree = await build_route_tree(role_routes, simple=True)
-    data = {"home": role_home, "routes": menu_tree}
-    return Success(data=data)
+        user_role_routes: list[Menu] = await Menu.filter(role_menus__id__in=role_ids).distinct() if role_ids else []
+        for user_role_route in user_role_routes:
+            if not user_role_route.constant or user_role_route.hide_in_menu:
+                role_routes.append(user_role_route)
+
+        role_routes = await menu_controller.with_ancestors(role_routes)
+
+    # 生成菜单树
+    menu_tree = build_route_tree(role_routes)
+    return {"home": role_home, "routes": menu_tree}
 
 
 @router.get("/{route_name}/exists", summary="路由是否存在", dependencies=[DependAuth])
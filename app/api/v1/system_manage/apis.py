@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Query
+from tortoise.expressions import Q
+
+from app.core.utils import insert_log
+from app.services.api import api_controller
+from app.sqlmodel.base import LogType, LogDetailType
+from app.schemas.base import SuccessExtra
+from app.core.utils import model_to_dict
+
+router = APIRouter()
+
+
+@router.get("/apis", summary="查看API列表")
+async def get_apis(
+        current: int = Query(1, description="页码"),
+        size: int = Query(10, description="每页数量"),
+        apiPath: str = Query(None, description="API路径"),
+        apiMethod: str = Query(None, description="请求方法"),
+        summary: str = Query(None, description="请求简介"),
+        status: str = Query(None, description="API状态")
+):
+    q = Q()
+    if apiPath:
+        q &= Q(api_path__contains=apiPath)
+    if apiMethod:
+        q &= Q(api_method=apiMethod.lower())
+    if summary:
+        q &= Q(summary__contains=summary)
+    if status:
+        q &= Q(status=status)
+
+    total, api_objs = await api_controller.list(page=current, page_size=size, search=q, order=["api_path", "api_method"])
+    records = [await model_to_dict(api_obj) for api_obj in api_objs]
+    data = {"records": records}
+    await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.ApiGetList, by_user_id=0)
+    return SuccessExtra(data=data, total=total, current=current, size=size)
@@ -5,12 +5,12 @@ from tortoise.expressions import Q
 
 from app.services.user import user_controller
 from app.services.log import log_controller
-from app.core.ctx import CTX_USER_ID
-from app.sqlmodel.admin import User, Role, Log, APILog
+from app.core.dependency import get_current_principal
+from app.sqlmodel.admin import Log
 from app.sqlmodel.base import LogType
 from app.schemas.base import Success, SuccessExtra, Fail
 from app.schemas.logs import LogUpdate, LogSearch
-from app.core.utils import model_to_dict
+from app.core.utils import model_to_dict, values_to_dict
 
 router = APIRouter()
 
@@ -36,11 +36,8 @@ async def get_logs(log_in: LogSearch = Depends()):
         _timeRange = log_in.time_range.split(",")
         q &= Q(create_time__gt=datetime.fromtimestamp(int(_timeRange[0]) / 1000), create_time__lt=datetime.fromtimestamp(int(_timeRange[1]) / 1000))
 
-    user_id = CTX_USER_ID.get()
-    
-    user_obj = await user_controller.get(id=user_id)
-    user_role_objs: list[Role] = await user_obj.roles
-    user_role_codes = [role_obj.role_code for role_obj in user_role_objs]
+    principal = await get_current_principal()
+    user_role_codes = principal.role_codes if principal else []
 
     if log_in.log_type is None:
         log_in.log_type = LogType.ApiLog
@@ -56,25 +53,49 @@ async def get_logs(log_in: LogSearch = Depends()):
     elif "R_SUPER" not in user_role_codes and "R_ADMIN" not in user_role_codes and log_in.log_type != LogType.ApiLog:  # 非超级管理员和管理员只能查看API日志
         return Fail(msg="Permission Denied")
 
-    total, log_objs = await log_controller.list(page=log_in.current, page_size=log_in.size, search=q, order=["-id"])
+    # 一次联表查出关联的API日志和操作人, 只取列表需要的字段
+    values = {
+        "id": "id",
+        "log_type": "log_type",
+        "log_detail_type": "log_detail_type",
+        "create_time": "create_time",
+        "request_url": "api_log__request_url",
+        "response_code": "api_log__response_code",
+        "user_name": "by_user__user_name",
+    }
+    cursor_mode = log_in.after_id is not None or log_in.before_id is not None
+    next_cursor = prev_cursor = None
+    if cursor_mode:
+        total, log_objs, next_cursor, prev_cursor = await log_controller.list_by_cursor(
+            page_size=log_in.size,
+            search=q,
+            after_id=log_in.after_id,
+            before_id=log_in.before_id,
+            with_total=bool(log_in.with_total),
+            values=values,
+        )
+    else:
+        total, log_objs = await log_controller.list(page=log_in.current, page_size=log_in.size, search=q, order=["-id"], values=values, count="estimated")
+        # 翻到较深的页时可以改用游标继续
+        if len(log_objs) == log_in.size:
+            next_cursor = log_objs[-1]["id"]
 
     records = []
     for obj in log_objs:
-        api_log: APILog = await obj.api_log  # type: ignore
-        by_user: User = await obj.by_user  # type: ignore
-        # data = await obj.to_dict(exclude_fields=["by_user_id", "api_log_id"])
-        data = await model_to_dict(obj,exclude_fields=["by_user_id", "api_log_id"])
+        data = values_to_dict(obj, exclude_fields=["request_url", "response_code", "user_name"])
         if log_in.log_type == LogType.ApiLog:
-            data["requestUrl"] = api_log.request_url
-            data["responseCode"] = api_log.response_code
+            data["requestUrl"] = obj["request_url"]
+            data["responseCode"] = obj["response_code"]
             data["logUser"] = "Request"
         elif log_in.log_type == LogType.SystemLog:
             data["logUser"] = "System"
         else:
-            data["logUser"] = by_user.user_name if by_user else "Error"
+            data["logUser"] = obj["user_name"] or "Error"
 
         records.append(data)
-    data = {"records": records}
+    data = {"records": records, "nextCursor": next_cursor}
+    if cursor_mode:
+        data["prevCursor"] = prev_cursor
     return SuccessExtra(data=data, total=total, current=log_in.current, size=log_in.size)
 
 
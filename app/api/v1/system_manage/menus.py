@@ -7,34 +7,31 @@ from app.sqlmodel.admin import Menu
 from app.sqlmodel.base import LogType, LogDetailType
 from app.schemas.base import Success, SuccessExtra
 from app.schemas.menus import MenuCreate, MenuUpdate
-from app.core.utils import model_to_dict
+from app.core.utils import build_tree, model_to_dict
 
 router = APIRouter()
 
 
 async def build_menu_tree(menus: list[Menu], parent_id: int = 0, simple: bool = False) -> list[dict]:
     """
-    递归生成菜单树
+    生成菜单树
     :param menus:
     :param parent_id:
     :param simple: 是否简化返回数据
     :return:
     """
-    tree = []
+    if simple:
+        return build_tree(menus, lambda menu: {"id": menu.id, "label": menu.menu_name, "pId": menu.parent_id}, parent_id)
+
+    # 完整数据需要查询按钮, 先逐个转换再同步组装
+    menu_dicts = {}
     for menu in menus:
-        if menu.parent_id == parent_id:
-            children = await build_menu_tree(menus, menu.id, simple)
-            if simple:
-                menu_dict = {"id": menu.id, "label": menu.menu_name, "pId": menu.parent_id}
-            else:
-                # menu_dict = await menu.to_dict()
-                menu_dict = await model_to_dict(menu)
-                # menu_dict["buttons"] = [await button.to_dict() for button in await menu.buttons]
-                menu_dict["buttons"] = [await model_to_dict(button) for button in await menu.buttons]
-            if children:
-                menu_dict["children"] = children
-            tree.append(menu_dict)
-    return tree
+        # menu_dict = await menu.to_dict()
+        menu_dict = await model_to_dict(menu)
+        # menu_dict["buttons"] = [await button.to_dict() for button in await menu.buttons]
+        menu_dict["buttons"] = [await model_to_dict(button) for button in await menu.buttons]
+        menu_dicts[menu.id] = menu_dict
+    return build_tree(menus, lambda menu: menu_dicts[menu.id], parent_id)
 
 
 @router.get("/menus", summary="查看用户菜单")
@@ -43,7 +40,7 @@ async def get_menus(
         size: int = Query(100, description="每页数量")
 ):
     total, menus = await menu_controller.list(page=current, page_size=size, order=["id"])
-    # 递归生成菜单
+    # 生成菜单树
     menu_tree = await build_menu_tree(menus, simple=False)
     data = {"records": menu_tree}
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.MenuGetList, by_user_id=0)
@@ -53,7 +50,7 @@ async def get_menus(
 @router.get("/menus/tree/", summary="查看菜单树")
 async def get_menus_tree():
     menus = await Menu.filter(constant=False)
-    # 递归生成菜单
+    # 生成菜单树
     menu_tree = await build_menu_tree(menus, simple=True)
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.MenuGetTree, by_user_id=0)
     return Success(data=menu_tree)
@@ -101,10 +98,7 @@ async def delete_menus_by_id(menu_id: int):
 
 @router.delete("/menus", summary="批量删除菜单")
 async def delete_menus(ids: str = Query(description="菜单ID列表, 用逗号隔开")):
-    menu_ids = ids.split(",")
-    for menu_id in menu_ids:
-        menu_obj = await Menu.get(id=int(menu_id))
-        await menu_obj.delete()
+    menu_ids = await menu_controller.remove_many([int(menu_id) for menu_id in ids.split(",")])
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.MenuBatchDeleteOne, by_user_id=0)
     return Success(msg="Deleted Successfully", data={"deleted_ids": menu_ids})
 
@@ -161,16 +155,7 @@ async def build_menu_button_tree(menus: list[Menu], parent_id: int = 0) -> list[
 @router.get("/menus/buttons/tree/", summary="查看菜单按钮树")
 async def get_menus_buttons_tree():
     menus_with_button = await Menu.filter(constant=False).annotate(button_count=Count('buttons')).filter(button_count__gt=0)
-    menu_objs = menus_with_button.copy()
-    while len(menus_with_button) > 0:
-        menu = menus_with_button.pop()
-        if menu.parent_id != 0:
-            menu = await Menu.get(id=menu.parent_id)
-            menus_with_button.append(menu)
-        else:
-            menu_objs.append(menu)
-
-    menu_objs = list(set(menu_objs))
+    menu_objs = await menu_controller.with_ancestors(menus_with_button)
     data = []
     if menu_objs:
         data = await build_menu_button_tree(menu_objs)
@@ -2,11 +2,12 @@ from fastapi import APIRouter, Query
 from tortoise.expressions import Q
 
 from app.core.utils import insert_log
+from app.core.invalidation import invalidation_bus
 from app.services.role import role_controller
 from app.services.menu import menu_controller
 from app.core.exceptions import HTTPException
-from app.sqlmodel.admin import  Button, Role
-from app.sqlmodel.base import LogType, LogDetailType
+from app.sqlmodel.admin import Api, Button, Role
+from app.sqlmodel.base import LogType, LogDetailType, StatusType
 from app.schemas.base import Success, SuccessExtra
 from app.schemas.roles import RoleCreate, RoleUpdate, RoleUpdateAuthrization
 from app.core.utils import model_to_dict
@@ -20,15 +21,19 @@ async def get_roles(
         size: int = Query(10, description="每页数量"),
         roleName: str = Query(None, description="角色名称"),
         roleCode: str = Query(None, description="角色编码"),
-        status: str = Query(None, description="用户状态")
+        status: StatusType = Query(None, description="用户状态"),
+        keyword: str = Query(None, alias="q", description="关键字, 匹配角色名称、角色编码")
 ):
+    # 模糊搜索字段均有pg_trgm GIN索引, 枚举字段用等值过滤
     q = Q()
+    if keyword:
+        q &= Q(role_name__contains=keyword) | Q(role_code__contains=keyword)
     if roleName:
         q &= Q(role_name__contains=roleName)
     if roleCode:
         q &= Q(role_code__contains=roleCode)
     if status:
-        q &= Q(status__contains=status)
+        q &= Q(status=status)
 
     total, role_objs = await role_controller.list(page=current, page_size=size, search=q, order=["id"])
     # records = [await role_obj.to_dict(exclude_fields=["role_desc"]) for role_obj in role_objs]
@@ -80,8 +85,7 @@ async def delete_roles(ids: str = Query(..., description="角色ID列表, 用逗
     role_ids = ids.split(",")
     deleted_ids = []
     for role_id in role_ids:
-        role_obj = await role_controller.get(id=int(role_id))
-        await role_obj.delete()
+        await role_controller.remove(id=int(role_id))
         deleted_ids.append(int(role_id))
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.RoleBatchDeleteOne, by_user_id=0)
     return Success(msg="Deleted Successfully", data={"deleted_ids": deleted_ids})
@@ -104,14 +108,10 @@ async def update_roles_by_id_menus(role_id: int, role_in: RoleUpdateAuthrization
     if role_in.role_home is not None:
         role_obj = await role_controller.update(id=role_id, obj_in=dict(role_home=role_in.role_home))
         if role_in.menu_ids:
-            await role_obj.menus.clear()
-            for menu_id in role_in.menu_ids:
-                menu_objs = [await menu_controller.get(id=menu_id)]
-                while len(menu_objs) > 0:
-                    menu_obj = menu_objs.pop()
-                    await role_obj.menus.add(menu_obj)
-                    if menu_obj.parent_id != 0:  # 子节点
-                        menu_objs.append(await menu_controller.get(id=menu_obj.parent_id))  # 父节点
+            # 选中的菜单及其所有父节点
+            menu_ids = set(role_in.menu_ids) | await menu_controller.get_ancestor_ids(role_in.menu_ids)
+            if await role_controller.sync_relation(role_obj, "menus", list(menu_ids)):
+                await invalidation_bus.publish("role", role_id)
 
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.RoleUpdateMenus, by_user_id=0)
     return Success(msg="Updated Successfully", data={"updated_menu_ids": role_in.menu_ids, "updated_role_home": role_in.role_home})
@@ -134,14 +134,32 @@ async def get_roles_by_id_buttons(role_id: int):
 async def update_roles_by_id_buttons(role_id: int, role_in: RoleUpdateAuthrization):
     role_obj = await role_controller.get(id=role_id)
     if role_in.button_ids is not None:
-        await role_obj.buttons.clear()
-        for button_id in role_in.button_ids:
-            button_obj = await Button.get(id=button_id)
-            await role_obj.buttons.add(button_obj)
+        if await role_controller.sync_relation(role_obj, "buttons", role_in.button_ids):
+            await invalidation_bus.publish("role", role_id)
 
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.RoleUpdateButtons, by_user_id=0)
     return Success(msg="Updated Successfully", data={"button_ids": role_in.button_ids})
 
 
+@router.get("/roles/{role_id}/apis", summary="查看角色API")
+async def get_roles_by_id_apis(role_id: int):
+    role_obj = await role_controller.get(id=role_id)
+    if role_obj.role_code == "R_SUPER":
+        api_objs = await Api.all()
+    else:
+        api_objs = await role_obj.apis
 
+    data = {"apiIds": [api_obj.id for api_obj in api_objs]}
+    await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.RoleGetApis, by_user_id=0)
+    return Success(data=data)
+
+
+@router.patch("/roles/{role_id}/apis", summary="更新角色API")
+async def update_roles_by_id_apis(role_id: int, role_in: RoleUpdateAuthrization):
+    role_obj = await role_controller.get(id=role_id)
+    if role_in.api_ids is not None:
+        if await role_controller.sync_relation(role_obj, "apis", role_in.api_ids):
+            await invalidation_bus.publish("role", role_id)
 
+    await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.RoleUpdateApis, by_user_id=0)
+    return Success(msg="Updated Successfully", data={"api_ids": role_in.api_ids})
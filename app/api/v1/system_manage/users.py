@@ -3,10 +3,10 @@ from tortoise.expressions import Q
 
 from app.core.utils import insert_log
 from app.services.user import user_controller
-from app.sqlmodel.base import LogType, LogDetailType
+from app.sqlmodel.base import GenderType, LogType, LogDetailType, StatusType
 from app.schemas.base import Success, SuccessExtra
 from app.schemas.users import UserCreate, UserUpdate
-from app.core.utils import model_to_dict
+from app.core.utils import model_to_dict, values_to_dict
 
 
 router = APIRouter()
@@ -17,17 +17,21 @@ async def get_users(
         current: int = Query(1, description="页码"),
         size: int = Query(10, description="每页数量"),
         userName: str = Query(None, description="用户名"),
-        userGender: str = Query(None, description="用户性别"),
+        userGender: GenderType = Query(None, description="用户性别"),
         nickName: str = Query(None, description="用户昵称"),
         userPhone: str = Query(None, description="用户手机"),
         userEmail: str = Query(None, description="用户邮箱"),
-        status: str = Query(None, description="用户状态")
+        status: StatusType = Query(None, description="用户状态"),
+        keyword: str = Query(None, alias="q", description="关键字, 匹配用户名、昵称、手机、邮箱")
 ):
+    # 模糊搜索字段均有pg_trgm GIN索引, 枚举字段用等值过滤
     q = Q()
+    if keyword:
+        q &= Q(user_name__contains=keyword) | Q(nick_name__contains=keyword) | Q(user_phone__contains=keyword) | Q(user_email__contains=keyword)
     if userName:
         q &= Q(user_name__contains=userName)
     if userGender:
-        q &= Q(user_gender__contains=userGender)
+        q &= Q(user_gender=userGender)
     if nickName:
         q &= Q(nick_name__contains=nickName)
     if userPhone:
@@ -35,16 +39,16 @@ async def get_users(
     if userEmail:
         q &= Q(user_email__contains=userEmail)
     if status:
-        q &= Q(status__contains=status)
+        q &= Q(status=status)
 
-    total, user_objs = await user_controller.list(page=current, page_size=size, search=q, order=["id"])
+    # 不查询password, 角色编码一次批量取回
+    values = {field: field for field in user_controller.model._meta.db_fields if field != "password"}
+    total, user_rows = await user_controller.list(page=current, page_size=size, search=q, order=["id"], values=values, count="estimated")
+    user_role_codes = await user_controller.get_role_codes([row["id"] for row in user_rows])
     records = []
-    for user_obj in user_objs:
-        # record = await user_obj.to_dict(exclude_fields=["password"])
-        record = await model_to_dict(user_obj,exclude_fields=["password"])
-        await user_obj.fetch_related('roles')
-        user_roles = [r.role_code for r in user_obj.roles]
-        record.update({"userRoles": user_roles})
+    for user_row in user_rows:
+        record = values_to_dict(user_row)
+        record.update({"userRoles": user_role_codes[user_row["id"]]})
         records.append(record)
     data = {"records": records}
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.UserGetList, by_user_id=0)
@@ -90,8 +94,7 @@ async def delete_users(ids: str = Query(..., description="用户ID列表, 用逗
     user_ids = ids.split(",")
     deleted_ids = []
     for user_id in user_ids:
-        user_obj = await user_controller.get(id=int(user_id))
-        await user_obj.delete()
+        await user_controller.remove(id=int(user_id))
         deleted_ids.append(int(user_id))
 
     await insert_log(log_type=LogType.AdminLog, log_detail_type=LogDetailType.UserBatchDeleteOne, by_user_id=0)
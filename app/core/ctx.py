@@ -2,5 +2,9 @@ import contextvars
 
 from starlette.background import BackgroundTasks
 
+from app.sqlmodel.admin import User
+
 CTX_USER_ID: contextvars.ContextVar[int] = contextvars.ContextVar("user_id", default=0)
+# 当前请求的用户, 每个请求最多查询一次
+CTX_USER: contextvars.ContextVar[User | None] = contextvars.ContextVar("user", default=None)
 CTX_BG_TASKS: contextvars.ContextVar[BackgroundTasks | None] = contextvars.ContextVar("bg_task", default=None)
@@ -1,24 +1,87 @@
+import hashlib
+import time
+from collections import OrderedDict
 from typing import Any
 
 import jwt
 from fastapi import Depends, Request
 from fastapi.security import OAuth2PasswordBearer
 
-from app.core.ctx import CTX_USER_ID
+from app.core.ctx import CTX_USER, CTX_USER_ID
+from app.core.permission import permission_engine
+from app.core.principal import Principal, principal_cache
 from app.core.exceptions import (
     HTTPException,
 )
 from app.sqlmodel.admin import Role, User, StatusType
 from app.settings.config import APP_SETTINGS
-# from app.core.utils import check_url
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
 
 
+class TokenCache:
+    """
+    已验证token的claims缓存(LRU), 以token摘要为key, 缓存到exp过期, SECRET_KEY或算法变化时清空
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._key: tuple[str, str] | None = None
+
+    @staticmethod
+    def _digest(value: str) -> bytes:
+        return hashlib.sha256(value.encode()).digest()
+
+    def _check_key(self) -> None:
+        key = (APP_SETTINGS.JWT_ALGORITHM, APP_SETTINGS.SECRET_KEY)
+        if key != self._key:
+            self._items.clear()
+            self._key = key
+
+    def get(self, token: str) -> dict | None:
+        self._check_key()
+        key = self._digest(token)
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        exp, claims = item
+        if exp <= time.time():
+            del self._items[key]
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def set(self, token: str, claims: dict) -> None:
+        if self.max_size <= 0 or "exp" not in claims:
+            return
+        self._check_key()
+        self._items[self._digest(token)] = (float(claims["exp"]), claims)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._items), "maxSize": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(max_size=APP_SETTINGS.JWT_CACHE_SIZE)
+
+
 def check_token(token: str) -> tuple[bool, int, Any]:
+    if (decode_data := token_cache.get(token)) is not None:
+        return True, 0, decode_data
     try:
         options = {"verify_signature": True, "verify_aud": False, "exp": True}
         decode_data = jwt.decode(token, APP_SETTINGS.SECRET_KEY, algorithms=[APP_SETTINGS.JWT_ALGORITHM], options=options)
+        token_cache.set(token, decode_data)
         return True, 0, decode_data
     except jwt.DecodeError:
         return False, 4010, "无效的Token"
@@ -28,9 +91,25 @@ def check_token(token: str) -> tuple[bool, int, Any]:
         return False, 5000, f"{repr(e)}"
 
 
+async def get_current_user() -> User | None:
+    """当前请求的完整用户记录, 同一请求内只查询一次; 只需要身份信息时用get_current_principal"""
+    user = CTX_USER.get()
+    user_id = CTX_USER_ID.get()
+    if user is None or user.id != user_id:
+        user = await User.filter(id=user_id).first() if user_id else None
+        CTX_USER.set(user)
+    return user
+
+
+async def get_current_principal() -> Principal | None:
+    """当前请求用户的身份(角色、按钮), 来自principal_cache"""
+    user_id = CTX_USER_ID.get()
+    return await principal_cache.get(user_id) if user_id else None
+
+
 class AuthControl:
     @classmethod
-    async def is_authed(cls, token: str = Depends(oauth2_schema)) -> User | None:
+    async def is_authed(cls, token: str = Depends(oauth2_schema)) -> Principal | None:
         user_id = CTX_USER_ID.get()
         if user_id == 0:
             status, code, decode_data = check_token(token)
@@ -42,37 +121,31 @@ class AuthControl:
 
             user_id = decode_data["data"]["userId"]
 
-        user = await User.filter(id=user_id).first()
-        if not user:
+        principal = await principal_cache.get(int(user_id))
+        if not principal:
             raise HTTPException(code="4040", msg=f"Authentication failed, the user_id: {user_id} does not exists in the system.")
         CTX_USER_ID.set(int(user_id))
-        return user
+        return principal
 
 
-# class PermissionControl:
-#     @classmethod
-#     async def has_permission(cls, request: Request, current_user: User = Depends(AuthControl.is_authed)) -> None:
-#         user_roles: list[Role] = await current_user.roles
-#         user_roles_codes: list[str] = [r.role_code for r in user_roles]
-#         if "R_SUPER" in user_roles_codes:  # 超级管理员
-#             return
-
-#         if not user_roles:
-#             raise HTTPException(code="4040", msg="The user is not bound to a role")
+class PermissionControl:
+    @classmethod
+    async def has_permission(cls, request: Request, principal: Principal = Depends(AuthControl.is_authed)) -> None:
+        if not APP_SETTINGS.API_PERMISSION_ENABLED or principal.is_super:  # 超级管理员
+            return
 
-#         method = request.method.lower()
-#         path = request.url.path
+        if not principal.role_ids:
+            raise HTTPException(code="4040", msg="The user is not bound to a role")
 
-#         apis = [await role.apis for role in user_roles]
-#         permission_apis = list(set((api.method.value, api.path, api.status) for api in sum(apis, [])))
-#         for (api_method, api_path, api_status) in permission_apis:
-#             if api_method == method and check_url(api_path, request.url.path):  # API权限检测通过
-#                 if api_status == StatusType.disable:
-#                     raise HTTPException(code="4030", msg=f"The API has been disabled, method: {method} path: {path}")
-#                 return
+        method = request.method
+        path = request.url.path
 
-#         raise HTTPException(code="4030", msg=f"Permission denied, method: {method} path: {path}")
+        api_id = permission_engine.match(method, path)
+        if api_id is None or not permission_engine.is_granted(principal.role_ids, api_id):
+            raise HTTPException(code="4030", msg=f"Permission denied, method: {method} path: {path}")
+        if not permission_engine.is_enabled(api_id):
+            raise HTTPException(code="4030", msg=f"The API has been disabled, method: {method} path: {path}")
 
 
 DependAuth = Depends(AuthControl.is_authed)
-# DependPermission = Depends(PermissionControl.has_permission)
\ No newline at end of file
+DependPermission = Depends(PermissionControl.has_permission)
\ No newline at end of file
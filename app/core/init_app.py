@@ -10,6 +10,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from aerich.migrate import Migrate
 
 from app.settings.config import APP_SETTINGS
+from app.services.api import api_controller
+from app.services.menu import menu_controller
 from app.services.role import role_controller
 from app.services.user import UserCreate, user_controller
 from app.core.exceptions import (
@@ -574,6 +576,13 @@ async def init_menus():
         icon="fluent:book-information-24-regular",
         icon_type=IconType.iconify,
     )
+    await menu_controller.rebuild_paths()
+
+
+async def init_apis(app: FastAPI):
+    new_count = await api_controller.refresh_api(app)
+    if new_count:
+        logger.info(f"Registered {new_count} new apis")
 
 
 async def init_users():
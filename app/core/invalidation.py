@@ -0,0 +1,116 @@
+import asyncio
+import inspect
+import uuid
+from typing import Any, Callable
+
+import orjson
+from loguru import logger
+from tortoise import connections
+
+from app.settings.config import APP_SETTINGS
+
+# 处理函数, 参数为实体id, None表示该类实体全部失效; 可以是协程函数
+InvalidationHandler = Callable[[int | None], Any]
+
+
+class InvalidationBus:
+    """
+    进程内缓存的失效总线, 基于Postgres LISTEN/NOTIFY在多个worker间广播
+    publish时先在本进程执行处理函数, 再NOTIFY其他worker; 监听连接断开重连后清空所有缓存, 避免漏掉期间的事件
+    """
+
+    def __init__(self, channel: str, connection_name: str, check_interval: float) -> None:
+        self.channel = channel
+        self.connection_name = connection_name
+        self.check_interval = check_interval
+        self.origin = uuid.uuid4().hex
+        self._handlers: dict[str, list[InvalidationHandler]] = {}
+        self._connection = None
+        self._task: asyncio.Task | None = None
+        self._pending: set[asyncio.Task] = set()
+
+    def subscribe(self, entity: str, handler: InvalidationHandler) -> None:
+        self._handlers.setdefault(entity, []).append(handler)
+
+    def dispatch(self, entity: str, entity_id: int | None = None) -> None:
+        for handler in self._handlers.get(entity, []):
+            try:
+                result = handler(entity_id)
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._pending.add(task)
+                    task.add_done_callback(self._pending.discard)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {entity} failed: {e!r}")
+
+    def dispatch_all(self) -> None:
+        for entity in self._handlers:
+            self.dispatch(entity)
+
+    async def publish(self, entity: str, entity_id: int | None = None) -> None:
+        self.dispatch(entity, entity_id)
+        payload = orjson.dumps({"origin": self.origin, "entity": entity, "id": entity_id}).decode()
+        try:
+            await connections.get(self.connection_name).execute_query("SELECT pg_notify($1, $2)", [self.channel, payload])
+        except Exception as e:
+            logger.error(f"Invalidation notify for {entity} failed: {e!r}")
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            message = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            return
+        if message.get("origin") == self.origin:
+            return
+        self.dispatch(message["entity"], message.get("id"))
+
+    async def _listen(self) -> None:
+        pool = connections.get(self.connection_name)._pool
+        self._connection = await pool.acquire()
+        await self._connection.add_listener(self.channel, self._on_notify)
+
+    async def _unlisten(self) -> None:
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        try:
+            if not connection.is_closed():
+                await connection.remove_listener(self.channel, self._on_notify)
+            await connections.get(self.connection_name)._pool.release(connection)
+        except Exception as e:
+            logger.warning(f"Invalidation listener release failed: {e!r}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            await self._listen()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._unlisten()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            if self._connection is not None and not self._connection.is_closed():
+                continue
+            try:
+                await self._unlisten()
+                await self._listen()
+                logger.warning("Invalidation listener reconnected, clearing all caches")
+                self.dispatch_all()
+            except Exception as e:
+                logger.error(f"Invalidation listener reconnect failed: {e!r}")
+
+
+invalidation_bus = InvalidationBus(
+    channel=APP_SETTINGS.INVALIDATION_CHANNEL,
+    connection_name="conn_system",
+    check_interval=APP_SETTINGS.INVALIDATION_CHECK_INTERVAL,
+)
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import date
+
+from loguru import logger
+from tortoise.models import Model
+
+from app.settings.config import APP_SETTINGS
+from app.sqlmodel.admin import APILog, Log
+
+
+# 分区维护的advisory lock键
+PARTITION_LOCK_KEY = 20261018
+
+
+def add_months(day: date, months: int) -> date:
+    """返回day所在月份偏移months个月后的月初"""
+    month = day.year * 12 + day.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+class LogPartitionManager:
+    """
+    api_logs/logs按create_time按月分区的维护任务
+    预建未来的分区, 超过保留月数的分区整体分离或删除, 代替大批量DELETE
+    """
+
+    def __init__(self, premake_months: int, retention_months: int, detach_only: bool, interval: float) -> None:
+        self.premake_months = premake_months
+        self.retention_months = retention_months
+        self.detach_only = detach_only
+        self.interval = interval
+        self.models: list[type[Model]] = []
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def partition_name(model: type[Model], month: date) -> str:
+        return f"{model._meta.db_table}_p{month:%Y%m}"
+
+    @staticmethod
+    async def is_partitioned(conn, model: type[Model]) -> bool:
+        return await conn.fetchval(
+            "SELECT c.relkind = 'p' FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = $1 AND n.nspname = $2",
+            model._meta.db_table, model._meta.schema,
+        ) is True
+
+    async def get_partitions(self, conn, model: type[Model]) -> dict[str, date]:
+        rows = await conn.fetch(
+            "SELECT c.relname AS name FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "JOIN pg_namespace n ON n.oid = p.relnamespace "
+            "WHERE p.relname = $1 AND n.nspname = $2 AND c.relname ~ '_p[0-9]{6}$'",
+            model._meta.db_table, model._meta.schema,
+        )
+        return {row["name"]: date(int(row["name"][-6:-2]), int(row["name"][-2:]), 1) for row in rows}
+
+    async def ensure_partitions(self, conn, model: type[Model]) -> None:
+        partitions = await self.get_partitions(conn, model)
+        today = date.today()
+        for offset in range(self.premake_months + 1):
+            month = add_months(today, offset)
+            name = self.partition_name(model, month)
+            if name in partitions:
+                continue
+            await conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{model._meta.db_table}" '
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+            logger.info(f"Log partition created: {name}")
+
+    async def expire_partitions(self, conn, model: type[Model]) -> None:
+        if self.retention_months <= 0:
+            return
+        expire_before = add_months(date.today(), -self.retention_months)
+        for name, month in sorted((await self.get_partitions(conn, model)).items()):
+            if month >= expire_before:
+                continue
+            if self.detach_only:
+                await conn.execute(f'ALTER TABLE "{model._meta.db_table}" DETACH PARTITION "{name}"')
+                logger.info(f"Log partition detached: {name}")
+            else:
+                await conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+                logger.info(f"Log partition dropped: {name}")
+
+    async def run_once(self) -> None:
+        """多个worker同时维护时只有拿到advisory lock的一个执行, 其他跳过"""
+        try:
+            async with APILog._meta.db.acquire_connection() as conn:
+                if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", PARTITION_LOCK_KEY):
+                    return
+                try:
+                    for model in self.models:
+                        try:
+                            await self.ensure_partitions(conn, model)
+                            await self.expire_partitions(conn, model)
+                        except Exception as e:
+                            logger.error(f"Log partition maintenance for {model._meta.db_table} failed: {e!r}")
+                finally:
+                    await conn.execute("SELECT pg_advisory_unlock($1)", PARTITION_LOCK_KEY)
+        except Exception as e:
+            logger.error(f"Log partition maintenance failed: {e!r}")
+
+    async def start(self) -> None:
+        """
+        启动时检查哪些表是分区表(generate_schemas建出的是普通表, 需要由迁移改为分区表), 只维护分区表
+        没有分区表时不启动; 有则先同步维护一次, 保证当月分区存在
+        """
+        if self._task is not None:
+            return
+        try:
+            async with APILog._meta.db.acquire_connection() as conn:
+                self.models = [model for model in (APILog, Log) if await self.is_partitioned(conn, model)]
+        except Exception as e:
+            logger.error(f"Log partition check failed: {e!r}")
+            return
+        for model in (APILog, Log):
+            if model not in self.models:
+                logger.warning(f"{model._meta.db_table} is not partitioned, log partition maintenance skipped")
+        if self.models:
+            await self.run_once()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+
+log_partition_manager = LogPartitionManager(
+    premake_months=APP_SETTINGS.LOG_PARTITION_PREMAKE_MONTHS,
+    retention_months=APP_SETTINGS.LOG_RETENTION_MONTHS,
+    detach_only=APP_SETTINGS.LOG_PARTITION_DETACH_ONLY,
+    interval=APP_SETTINGS.LOG_PARTITION_CHECK_INTERVAL,
+)
@@ -0,0 +1,53 @@
+import random
+from functools import lru_cache
+
+from app.core.matcher import RouteMatcher
+from app.settings.config import APP_SETTINGS
+
+
+class LogRule:
+    """
+    单条路由的API日志策略
+    :param route: 路由规则, 语法同ADD_LOG_ORIGINS_INCLUDE
+    :param sample_rate: 采样率, 0~1
+    :param keep_request: 是否记录请求体
+    :param keep_response: 是否记录响应体
+    """
+
+    def __init__(self, route: str = "*", sample_rate: float = 1.0, keep_request: bool = True, keep_response: bool = True) -> None:
+        self.route = route
+        self.matcher = RouteMatcher([route])
+        self.sample_rate = sample_rate
+        self.keep_request = keep_request
+        self.keep_response = keep_response
+
+    def sample(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+
+class APILogPolicy:
+    """
+    API日志采样与详细程度策略, 按顺序取第一条匹配的规则, 未匹配时全量记录
+    出错(HTTP状态码>=400, 或响应中有业务码且不为0000)和慢请求总是记录
+    """
+
+    def __init__(self, rules: list[dict], slow_threshold: float, cache_size: int = 4096) -> None:
+        self.rules = [LogRule(**rule) for rule in rules]
+        self.default_rule = LogRule()
+        self.slow_threshold = slow_threshold
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def _resolve(self, method: str, path: str) -> LogRule:
+        for rule in self.rules:
+            if rule.matcher.match(method, path):
+                return rule
+        return self.default_rule
+
+    def is_error(self, status_code: int | None, response_code: str | None) -> bool:
+        return (status_code is not None and status_code >= 400) or (bool(response_code) and response_code != "0000")
+
+    def is_slow(self, process_time: float | None) -> bool:
+        return process_time is not None and process_time >= self.slow_threshold
+
+
+api_log_policy = APILogPolicy(APP_SETTINGS.API_LOG_POLICIES, APP_SETTINGS.API_LOG_SLOW_THRESHOLD)
@@ -0,0 +1,297 @@
+import asyncio
+import re
+from datetime import datetime
+from typing import Any
+
+import orjson
+from loguru import logger
+from tortoise.transactions import in_transaction
+
+from app.core.bgtask import BgTasks
+from app.core.log_policy import LogRule, api_log_policy
+from app.settings.config import APP_SETTINGS
+from app.sqlmodel.admin import APILog, Log
+from app.sqlmodel.base import LogType
+
+
+RESPONSE_CODE_PATTERN = re.compile(rb'"code"\s*:\s*"?(-?\w{1,6})')
+USER_AGENT_MAX_LENGTH = APILog._meta.fields_map["user_agent"].max_length
+REQUEST_URL_MAX_LENGTH = APILog._meta.fields_map["request_url"].max_length
+
+
+class BodyCapture:
+    """
+    按块收集请求/响应体, 超过上限后丢弃内容只保留大小, 写入日志时才解析
+    """
+
+    HEAD_SIZE = 256
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.body = bytearray()
+        self.head = b""  # 开头部分, 截断后仍可用于提取业务码
+        self.size = 0
+        self.truncated = False
+
+    def add(self, chunk: bytes) -> None:
+        if not chunk:
+            return
+        if len(self.head) < self.HEAD_SIZE:
+            self.head += chunk[:self.HEAD_SIZE - len(self.head)]
+        self.size += len(chunk)
+        if self.truncated:
+            return
+        if self.size > self.limit:
+            self.truncated = True
+            self.body = bytearray()
+            return
+        self.body.extend(chunk)
+
+    @property
+    def data(self) -> Any:
+        if self.truncated:
+            return {"truncated": True, "size": self.size}
+        if not self.body:
+            return None
+        try:
+            return orjson.loads(self.body)
+        except orjson.JSONDecodeError:
+            return None
+
+
+class APILogRecord:
+    """
+    单个请求的API日志, 请求信息与响应信息都收集到这里, 响应结束后只写入一次
+    """
+
+    def __init__(
+        self,
+        ip_address: str,
+        user_agent: str | None,
+        request_url: str,
+        request_params: dict | None = None,
+        by_user_id: int | None = None,
+        rule: LogRule | None = None,
+    ) -> None:
+        rule = rule or api_log_policy.default_rule
+        self.start_time = datetime.now()
+        self.ip_address = ip_address
+        self.user_agent = user_agent
+        self.request_url = request_url
+        self.request_params = request_params
+        self.by_user_id = by_user_id
+        self.sampled = rule.sample()
+        self.keep_request = rule.keep_request
+        self.keep_response = rule.keep_response
+        self.request_body = BodyCapture(APP_SETTINGS.API_LOG_REQUEST_BODY_LIMIT)
+        self.response_body: BodyCapture | None = None  # 非JSON响应不收集
+        self.status_code: int | None = None
+        self.response_code: str | None = None
+        self.process_time: float | None = None
+        self.submitted = False
+
+    def start_response(self, status_code: int, content_type: str) -> None:
+        self.status_code = status_code
+        if "json" in content_type:
+            # 不记录响应体时上限为0, 仍保留开头部分用于提取业务码
+            self.response_body = BodyCapture(APP_SETTINGS.API_LOG_RESPONSE_BODY_LIMIT if self.keep_response else 0)
+
+    def add_response_body(self, chunk: bytes) -> None:
+        if self.response_body is not None:
+            self.response_body.add(chunk)
+
+    def finish(self) -> None:
+        if self.response_body is not None and self.response_body.size:
+            # Custom响应的code在最前面, 只匹配开头部分, 不做完整解析; 没有code(非统一格式的响应)时保持None
+            match = RESPONSE_CODE_PATTERN.search(self.response_body.head)
+            self.response_code = match.group(1).decode() if match else None
+        self.process_time = (datetime.now() - self.start_time).total_seconds()
+
+    @property
+    def should_persist(self) -> bool:
+        """未被采样的请求, 出错或慢请求时仍然记录"""
+        return (
+            self.sampled
+            or api_log_policy.is_error(self.status_code, self.response_code)
+            or api_log_policy.is_slow(self.process_time)
+        )
+
+    @property
+    def response_data(self) -> Any:
+        if self.response_body is None or not self.keep_response:
+            return None
+        data = self.response_body.data
+        if self.response_body.truncated and self.response_code is not None:
+            data["code"] = self.response_code
+        return data
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "ip_address": self.ip_address,
+            # 超长或为空的值会让整批写入失败, 按列长度截断
+            "user_agent": (self.user_agent or "")[:USER_AGENT_MAX_LENGTH],
+            "request_url": (self.request_url or "")[:REQUEST_URL_MAX_LENGTH],
+            "request_params": self.request_params,
+            "request_data": self.request_body.data if self.keep_request else None,
+            "response_data": self.response_data,
+            "response_code": self.response_code,
+            "process_time": self.process_time,
+            "create_time": self.start_time,
+            "by_user_id": self.by_user_id,
+        }
+
+
+class APILogWriter:
+    """
+    API日志批量写入
+    请求内只入队, 由lifespan中启动的后台任务按数量/时间阈值批量落库, 关闭时写完剩余日志
+    """
+
+    def __init__(self, max_size: int, batch_size: int, flush_interval: float) -> None:
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue[APILogRecord] | None = None
+        self._task: asyncio.Task | None = None
+        self._pending: list[APILogRecord] = []  # 已出队未写入的日志, 写入后移除, 取消时由stop写完剩余部分
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def submit(self, record: APILogRecord) -> None:
+        """
+        提交请求日志, 同一请求只提交一次
+        batch模式入队批量写入, direct模式交给后台任务在响应结束后写入
+        """
+        if record.submitted:
+            return
+        record.submitted = True
+        if not record.should_persist:
+            return
+        if APP_SETTINGS.API_LOG_WRITE_MODE == "direct":
+            await BgTasks.add_task(self._write_one, record)
+        else:
+            self.enqueue(record)
+
+    def enqueue(self, record: APILogRecord) -> bool:
+        """
+        日志入队, 不阻塞请求
+        :param record: 请求日志
+        :return: 是否入队成功
+        """
+        if self._queue is None:
+            logger.warning("APILogWriter is not started, api log dropped")
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            logger.warning("APILogWriter queue is full, api log dropped")
+            return False
+        return True
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务并写完队列中剩余的日志"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._queue is not None:
+            records, self._pending = self._pending, []
+            while not self._queue.empty():
+                records.append(self._queue.get_nowait())
+            for i in range(0, len(records), self.batch_size):
+                await self._write(records[i:i + self.batch_size])
+            self._queue = None
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                try:
+                    self._pending.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(self._pending)
+            self._pending = []
+
+    @staticmethod
+    async def _write_one(record: APILogRecord) -> None:
+        api_log_data = record.to_dict()
+        by_user_id = api_log_data.pop("by_user_id", None)
+        try:
+            async with in_transaction(APILog._meta.default_connection) as conn:
+                api_log_obj = await APILog.create(**api_log_data, using_db=conn)
+                await Log.create(
+                    log_type=LogType.ApiLog,
+                    by_user_id=by_user_id,
+                    api_log=api_log_obj,
+                    create_time=api_log_data.get("create_time"),
+                    using_db=conn,
+                )
+        except Exception as e:
+            logger.error(f"APILogWriter write api log failed: {e!r}")
+
+    async def _write(self, records: list[APILogRecord]) -> None:
+        """
+        写入一批日志, 写入成功的日志随即从records中移除
+        任务在写入中途被取消时, records中只剩未写入的日志, 由stop补写, 不会重复写入
+        """
+        if not records:
+            return
+        try:
+            async with in_transaction(APILog._meta.default_connection) as conn:
+                # 预先从序列中一次取出主键, bulk_create不会回填主键
+                rows = await conn.execute_query_dict(
+                    f"SELECT nextval(pg_get_serial_sequence('{APILog._meta.schema}.{APILog._meta.db_table}', 'id')) AS id "
+                    "FROM generate_series(1, $1)",
+                    [len(records)],
+                )
+                api_log_objs, log_objs = [], []
+                for row, record in zip(rows, records):
+                    api_log_data = record.to_dict()
+                    by_user_id = api_log_data.pop("by_user_id", None)
+                    api_log_objs.append(APILog(id=row["id"], **api_log_data))
+                    log_objs.append(Log(
+                        log_type=LogType.ApiLog,
+                        by_user_id=by_user_id,
+                        api_log_id=row["id"],
+                        create_time=api_log_data.get("create_time"),
+                    ))
+                await APILog.bulk_create(api_log_objs, using_db=conn)
+                await Log.bulk_create(log_objs, using_db=conn)
+            records.clear()
+        except Exception as e:
+            # 批量失败时逐条重试, 只丢弃出错的那条
+            logger.error(f"APILogWriter write {len(records)} api logs failed, retrying one by one: {e!r}")
+            while records:
+                await self._write_one(records[0])
+                del records[0]
+
+
+api_log_writer = APILogWriter(
+    max_size=APP_SETTINGS.API_LOG_QUEUE_SIZE,
+    batch_size=APP_SETTINGS.API_LOG_BATCH_SIZE,
+    flush_interval=APP_SETTINGS.API_LOG_FLUSH_INTERVAL,
+)
@@ -0,0 +1,62 @@
+import re
+from fnmatch import translate
+from functools import lru_cache
+
+HTTP_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+
+
+def rule_to_regex(rule: str) -> str:
+    """
+    单条路由规则转为正则
+    re:开头为正则(search); 含*?[为通配符, 匹配完整路径; 其他为子串匹配(与原有配置行为一致)
+    """
+    if rule.startswith("re:"):
+        return rule[3:]
+    if rule == "*":
+        return ".*"
+    if any(c in rule for c in "*?["):
+        return rf"^{translate(rule)}"
+    return re.escape(rule)
+
+
+class RouteMatcher:
+    """
+    路由规则匹配, 启动时把所有规则编译为每个请求方法一个合并正则
+    规则可带请求方法前缀, 如 "GET /api/v1/route/*", "POST,PUT re:^/api/v1/auth/"
+    """
+
+    def __init__(self, rules: list[str]) -> None:
+        self.rules = list(rules)
+        self._patterns: dict[str | None, list[str]] = {}
+        for rule in self.rules:
+            methods: list[str | None] = [None]
+            prefix, _, rest = rule.partition(" ")
+            if rest and all(m.upper() in HTTP_METHODS for m in prefix.split(",")):
+                methods, rule = [m.upper() for m in prefix.split(",")], rest.strip()
+            for method in methods:
+                self._patterns.setdefault(method, []).append(rule_to_regex(rule))
+        self._compiled: dict[str, re.Pattern | None] = {}
+
+    def _compile(self, method: str) -> re.Pattern | None:
+        if method not in self._compiled:
+            patterns = self._patterns.get(None, []) + self._patterns.get(method, [])
+            self._compiled[method] = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        return self._compiled[method]
+
+    def match(self, method: str, path: str) -> bool:
+        pattern = self._compile(method.upper())
+        return pattern is not None and pattern.search(path) is not None
+
+
+class RouteFilter:
+    """
+    include/exclude规则组合, 按(方法, 路径)缓存结果
+    """
+
+    def __init__(self, include: list[str], exclude: list[str], cache_size: int = 4096) -> None:
+        self.include = RouteMatcher(include)
+        self.exclude = RouteMatcher(exclude)
+        self.allowed = lru_cache(maxsize=cache_size)(self._allowed)
+
+    def _allowed(self, method: str, path: str) -> bool:
+        return self.include.match(method, path) and not self.exclude.match(method, path)
@@ -1,17 +1,17 @@
-from datetime import datetime
-from json import JSONDecodeError
-
-import orjson
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers
 from starlette.requests import Request
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.bgtask import BgTasks
-from app.sqlmodel.admin import User, Log, APILog
-from app.sqlmodel.base import LogType
 from app.settings.config import APP_SETTINGS
 from app.core.ctx import CTX_USER_ID
 from app.core.dependency import check_token
+from app.core.log_writer import APILogRecord, api_log_writer
+from app.core.principal import principal_cache
+from app.core.log_policy import api_log_policy
+from app.core.matcher import RouteFilter
+
+api_log_route_filter = RouteFilter(APP_SETTINGS.ADD_LOG_ORIGINS_INCLUDE, APP_SETTINGS.ADD_LOG_ORIGINS_DECLUDE)
 
 
 class SimpleBaseMiddleware:
@@ -43,72 +43,96 @@ class SimpleBaseMiddleware:
 
 
 class BackGroundTaskMiddleware(SimpleBaseMiddleware):
-    async def before_request(self, request: Request) -> ASGIApp | None:
+    async def handle_http(self, scope, receive, send) -> None:
         await BgTasks.init_bg_tasks_obj()
-        # return self.app
-        return None
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # 响应全部发送完成后再执行, 且只执行一次
+            await BgTasks.execute_tasks()
 
-    async def after_request(self, request: Request, response: dict) -> None:
-        await BgTasks.execute_tasks()
 
+class APILoggerMiddleware(SimpleBaseMiddleware):
+    """
+    收集请求信息到request.state.api_log, 响应完成后由APILoggerAddResponseMiddleware补全并写入一次
+    请求体在receive中按块旁路复制(有上限), 写入日志时才解析
+    """
 
-class APILoggerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request.state.start_time = datetime.now()
-        path = request.url.path
+    async def handle_http(self, scope, receive, send) -> None:
+        request = Request(scope, receive)
+        await self.before_request(request)
+        api_log: APILogRecord | None = getattr(request.state, "api_log", None)
+        if api_log is None:
+            await self.app(scope, receive, send)
+            return
 
         if (
-                all([declude not in path for declude in APP_SETTINGS.ADD_LOG_ORIGINS_DECLUDE])
-                and (
-                "*" in APP_SETTINGS.ADD_LOG_ORIGINS_INCLUDE
-                or any([include in path for include in APP_SETTINGS.ADD_LOG_ORIGINS_INCLUDE]))
+                api_log.keep_request
+                and request.method in ["POST", "PUT", "PATCH"]
+                and "json" in request.headers.get("content-type", "")
         ):
-            if request.scope["type"] == "http":
-                token = request.headers.get("Authorization")
-                user_obj = None
-                if token:
-                    status, _, decode_data = check_token(token.replace("Bearer ", "", 1))
-                    if status and decode_data:
-                        user_id = int(decode_data["data"]["userId"])
-                        user_obj = await User.filter(id=user_id).first()
-                        if user_obj:
-                            CTX_USER_ID.set(user_id)
-                try:
-                    request_data = await request.json() if request.method in ["POST", "PUT", "PATCH"] else None
-                except JSONDecodeError:
-                    request_data = None
-
-                api_log_data = {
-                    "ip_address": request.client.host if request.client else "none",
-                    "user_agent": request.headers.get("user-agent"),
-                    "request_url": str(request.url),
-                    "request_params": dict(request.query_params) or None,
-                    "request_data": request_data
-                }
-                api_log_obj = await APILog.create(**api_log_data)
-                request.state.api_log_id = api_log_obj.id
-                await Log.create(log_type=LogType.ApiLog, by_user=user_obj, api_log=api_log_obj)
-
-        response = await call_next(request)
-        return response
+            receive = self.receive_wrapper(receive, api_log)
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # 未产生响应时只记录请求信息
+            api_log.status_code = 500
+            api_log.finish()
+            await api_log_writer.submit(api_log)
+            raise
+
+    @staticmethod
+    def receive_wrapper(receive: Receive, api_log: APILogRecord) -> Receive:
+        async def _receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                api_log.request_body.add(message.get("body", b""))
+            return message
+
+        return _receive
+
+    async def before_request(self, request: Request) -> ASGIApp | None:
+        if not api_log_route_filter.allowed(request.method, request.url.path):
+            return None
+
+        token = request.headers.get("Authorization")
+        principal = None
+        if token:
+            status, _, decode_data = check_token(token.replace("Bearer ", "", 1))
+            if status and decode_data:
+                user_id = int(decode_data["data"]["userId"])
+                principal = await principal_cache.get(user_id)
+                if principal:
+                    CTX_USER_ID.set(user_id)
+
+        request.state.api_log = APILogRecord(
+            ip_address=request.client.host if request.client else "none",
+            user_agent=request.headers.get("user-agent"),
+            request_url=str(request.url),
+            request_params=dict(request.query_params) or None,
+            by_user_id=principal.user_id if principal else None,
+            rule=api_log_policy.resolve(request.method, request.url.path),
+        )
+        return None
 
 
 class APILoggerAddResponseMiddleware(SimpleBaseMiddleware):
     """
     需要与APILoggerMiddleware搭配使用
+    响应体可能分多块发送, 按块收集(有上限), 最后一块发送时写入日志
     """
 
     async def after_request(self, request: Request, response: dict) -> None:
-        if hasattr(request.state, "api_log_id") and response.get("type") == "http.response.body":
-            response_body = response.get("body", b"")
-            try:
-                resp = orjson.loads(response_body)
-                api_log_obj = await APILog.get(id=request.state.api_log_id)
-                if api_log_obj:
-                    api_log_obj.response_data = resp
-                    api_log_obj.response_code = resp.get("code", "-1")
-                    api_log_obj.process_time = (datetime.now() - request.state.start_time).total_seconds()
-                    await api_log_obj.save()
-
-            except orjson.JSONDecodeError:
-                pass
+        api_log: APILogRecord | None = getattr(request.state, "api_log", None)
+        if api_log is None:
+            return
+
+        if response.get("type") == "http.response.start":
+            headers = Headers(raw=response.get("headers", []))
+            api_log.start_response(response["status"], headers.get("content-type", ""))
+        elif response.get("type") == "http.response.body":
+            api_log.add_response_body(response.get("body", b""))
+            if not response.get("more_body", False):
+                api_log.finish()
+                await api_log_writer.submit(api_log)
@@ -0,0 +1,94 @@
+from loguru import logger
+
+from app.core.invalidation import invalidation_bus
+from app.sqlmodel.admin import Api, Role
+from app.sqlmodel.base import StatusType
+
+
+class RouteNode:
+    """
+    路由前缀树节点, 按路径段匹配
+    static为静态段, param为{xxx}参数段, catch_all为{xxx:path}匹配剩余所有段
+    """
+
+    __slots__ = ("static", "param", "catch_all", "api_id")
+
+    def __init__(self) -> None:
+        self.static: dict[str, RouteNode] = {}
+        self.param: RouteNode | None = None
+        self.catch_all: int | None = None
+        self.api_id: int | None = None
+
+    def insert(self, segments: list[str], api_id: int) -> None:
+        node = self
+        for segment in segments:
+            if segment.startswith("{") and segment.endswith("}"):
+                if segment.endswith(":path}"):
+                    node.catch_all = api_id
+                    return
+                if node.param is None:
+                    node.param = RouteNode()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, RouteNode())
+        node.api_id = api_id
+
+    def match(self, segments: list[str], index: int = 0) -> int | None:
+        """静态段优先, 其次参数段, 最后catch_all, 与路由注册的常见写法一致"""
+        if index == len(segments):
+            return self.api_id if self.api_id is not None else self.catch_all
+        segment = segments[index]
+        child = self.static.get(segment)
+        if child is not None and (api_id := child.match(segments, index + 1)) is not None:
+            return api_id
+        if self.param is not None and segment and (api_id := self.param.match(segments, index + 1)) is not None:
+            return api_id
+        return self.catch_all
+
+
+class PermissionEngine:
+    """
+    API权限引擎, 启动时及权限变更时把所有API编译为每个请求方法一棵前缀树, 角色授权编译为API id集合
+    鉴权时只做一次前缀树匹配(与路径长度线性相关)和集合查找, 不查询数据库
+    """
+
+    def __init__(self) -> None:
+        self._trees: dict[str, RouteNode] = {}
+        self._api_status: dict[int, StatusType] = {}
+        self._role_apis: dict[int, frozenset[int]] = {}
+
+    @staticmethod
+    def split_path(path: str) -> list[str]:
+        return path.strip("/").split("/")
+
+    async def reload(self) -> None:
+        trees: dict[str, RouteNode] = {}
+        api_status: dict[int, StatusType] = {}
+        for api in await Api.all().values("id", "api_path", "api_method", "status"):
+            trees.setdefault(api["api_method"].upper(), RouteNode()).insert(self.split_path(api["api_path"]), api["id"])
+            api_status[api["id"]] = api["status"]
+
+        role_apis: dict[int, set[int]] = {}
+        for role_id, api_id in await Role.filter(apis__id__isnull=False).values_list("id", "apis__id"):
+            role_apis.setdefault(role_id, set()).add(api_id)
+
+        # 整体替换, 请求中不会看到构建到一半的状态
+        self._trees = trees
+        self._api_status = api_status
+        self._role_apis = {role_id: frozenset(api_ids) for role_id, api_ids in role_apis.items()}
+        logger.info(f"Permission engine loaded: {len(api_status)} apis, {len(role_apis)} roles")
+
+    def match(self, method: str, path: str) -> int | None:
+        tree = self._trees.get(method.upper())
+        return tree.match(self.split_path(path)) if tree is not None else None
+
+    def is_enabled(self, api_id: int) -> bool:
+        return self._api_status.get(api_id) != StatusType.disable
+
+    def is_granted(self, role_ids: list[int], api_id: int) -> bool:
+        return any(api_id in self._role_apis.get(role_id, ()) for role_id in role_ids)
+
+
+permission_engine = PermissionEngine()
+invalidation_bus.subscribe("role", lambda _: permission_engine.reload())
+invalidation_bus.subscribe("api", lambda _: permission_engine.reload())
@@ -0,0 +1,121 @@
+import time
+from collections import OrderedDict
+
+from app.core.invalidation import invalidation_bus
+from app.settings.config import APP_SETTINGS
+from app.sqlmodel.admin import Button, User
+from app.sqlmodel.base import StatusType
+
+
+class Principal:
+    """
+    用户身份: 状态、角色及有效按钮权限
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        user_name: str,
+        status: StatusType,
+        role_ids: list[int],
+        role_codes: list[str],
+        role_homes: list[str],
+        button_codes: list[str],
+    ) -> None:
+        self.user_id = user_id
+        self.user_name = user_name
+        self.status = status
+        self.role_ids = role_ids
+        self.role_codes = role_codes
+        self.role_homes = role_homes
+        self.button_codes = button_codes
+
+    @property
+    def is_super(self) -> bool:
+        return "R_SUPER" in self.role_codes
+
+    @property
+    def role_home(self) -> str:
+        return self.role_homes[-1] if self.role_homes else "home"
+
+
+class PrincipalCache:
+    """
+    用户身份缓存(LRU), 用户、角色、按钮变更时由对应controller主动失效, TTL兜底
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+        self._super_button_codes: list[str] | None = None
+
+    async def get(self, user_id: int) -> Principal | None:
+        item = self._items.get(user_id)
+        if item is not None and item[0] > time.monotonic():
+            self._items.move_to_end(user_id)
+            return item[1]
+
+        principal = await self.load(user_id)
+        if principal is None:
+            self._items.pop(user_id, None)
+            return None
+        self._items[user_id] = (time.monotonic() + self.ttl, principal)
+        self._items.move_to_end(user_id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return principal
+
+    async def get_super_button_codes(self) -> list[str]:
+        """超级管理员拥有全部按钮, 单独缓存, 按钮或菜单变更时失效"""
+        if self._super_button_codes is None:
+            self._super_button_codes = list(await Button.all().distinct().values_list("button_code", flat=True))  # type: ignore
+        return self._super_button_codes
+
+    async def load(self, user_id: int) -> Principal | None:
+        # users -> users_roles -> roles -> roles_buttons -> buttons 一次查询取回角色和按钮
+        rows = await User.filter(id=user_id).values_list(
+            "user_name", "status", "roles__id", "roles__role_code", "roles__role_home", "roles__buttons__button_code"
+        )
+        if not rows:
+            return None
+
+        role_ids: list[int] = []
+        role_codes: list[str] = []
+        role_homes: list[str] = []
+        button_codes: set[str] = set()
+        for _, _, role_id, role_code, role_home, button_code in rows:
+            if role_id is not None and role_id not in role_ids:
+                role_ids.append(role_id)
+                role_codes.append(role_code)
+                if role_home:
+                    role_homes.append(role_home)
+            if button_code is not None:
+                button_codes.add(button_code)
+
+        user_name, status = rows[0][0], rows[0][1]
+        return Principal(
+            user_id=user_id,
+            user_name=user_name,
+            status=status,
+            role_ids=role_ids,
+            role_codes=role_codes,
+            role_homes=role_homes,
+            button_codes=await self.get_super_button_codes() if "R_SUPER" in role_codes else list(button_codes),
+        )
+
+    def invalidate(self, user_id: int | None = None) -> None:
+        if user_id is None:
+            self._items.clear()
+        else:
+            self._items.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._super_button_codes = None
+
+
+principal_cache = PrincipalCache(ttl=APP_SETTINGS.PRINCIPAL_CACHE_TTL, max_size=APP_SETTINGS.PRINCIPAL_CACHE_SIZE)
+invalidation_bus.subscribe("user", principal_cache.invalidate)
+for entity in ("role", "menu", "button"):
+    invalidation_bus.subscribe(entity, lambda _: principal_cache.clear())
@@ -0,0 +1,61 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+import orjson
+from fastapi import Request, Response
+
+from app.core.invalidation import invalidation_bus
+
+
+class CachedResponse:
+    """预先编码好的响应体及其ETag"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, data: Any) -> None:
+        self.body = orjson.dumps({"code": "0000", "msg": "OK", "data": data})
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:20]}"'
+
+    def not_modified(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        return any(tag.strip().removeprefix("W/") in (self.etag, "*") for tag in if_none_match.split(","))
+
+    def to_response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.not_modified(request):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    Success响应的缓存(LRU), 缓存编码后的JSON字节, 订阅的实体变更时整体清空
+    """
+
+    def __init__(self, max_size: int, entities: tuple[str, ...]) -> None:
+        self.max_size = max_size
+        self._items: OrderedDict[Hashable, CachedResponse] = OrderedDict()
+        self._generation = 0
+        for entity in entities:
+            invalidation_bus.subscribe(entity, self.clear)
+
+    async def get(self, key: Hashable, build: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        cached = self._items.get(key)
+        if cached is not None:
+            self._items.move_to_end(key)
+            return cached
+        generation = self._generation
+        cached = CachedResponse(await build())
+        if generation != self._generation:  # 构建期间被清空, 结果可能已过期, 不缓存
+            return cached
+        self._items[key] = cached
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+        return cached
+
+    def clear(self, *_) -> None:
+        self._generation += 1
+        self._items.clear()
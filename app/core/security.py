@@ -1,6 +1,13 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
 import jwt
 from passlib.context import CryptContext
 
+from app.core.exceptions import HTTPException
+
 from app.schemas.login import JWTPayload
 from app.settings.config import APP_SETTINGS
 
@@ -23,3 +30,80 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+
+class PasswordHasher:
+    """
+    Argon2计算放到独立的线程池/进程池执行, 避免登录高峰阻塞事件循环
+    排队数(执行中+等待中)超过workers+queue_size时直接拒绝
+    """
+
+    def __init__(self, mode: str, workers: int, queue_size: int) -> None:
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: Executor | None = None
+        self.pending = 0
+        self.rejected = 0
+        self.failed = 0
+        self.completed = 0  # 成功完成的次数, 耗时也只统计成功的
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise HTTPException(code="4290", msg="Too many requests, please try again later.")
+        self.pending += 1
+        start_time = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        cost = time.perf_counter() - start_time
+        self.completed += 1
+        self.total_time += cost
+        self.max_time = max(self.max_time, cost)
+        return result
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "pending": self.pending,
+            "queued": max(self.pending - self.workers, 0),
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "completed": self.completed,
+            "avgSeconds": round(self.total_time / self.completed, 6) if self.completed else 0,
+            "maxSeconds": round(self.max_time, 6),
+        }
+
+
+password_hasher = PasswordHasher(
+    mode=APP_SETTINGS.PASSWORD_HASH_MODE,
+    workers=APP_SETTINGS.PASSWORD_HASH_WORKERS,
+    queue_size=APP_SETTINGS.PASSWORD_HASH_QUEUE_SIZE,
+)
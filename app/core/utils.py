@@ -1,11 +1,13 @@
 import re
+from collections import deque
+from typing import Any, Callable
 from uuid import UUID
 from datetime import datetime
 
 from tortoise import models
 
 from app.core.ctx import CTX_USER_ID
-from app.sqlmodel.admin import  Log
+from app.sqlmodel.admin import  Log, Menu
 from app.sqlmodel.base import LogType, LogDetailType
 
 
@@ -67,6 +69,58 @@ async def model_to_dict(
     return d
 
 
+def values_to_dict(values: dict, exclude_fields: list[str] | None = None) -> dict:
+    """
+    将values()查询结果转换为与model_to_dict一致的格式
+    :param values: values()返回的单行
+    :param exclude_fields: 要排除的字段名列表
+    :return:
+    """
+    exclude_fields = exclude_fields or []
+
+    d = {}
+    for field, value in values.items():
+        if field in exclude_fields:
+            continue
+        if isinstance(value, datetime):
+            value = value.strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(value, UUID):
+            value = str(value)
+        d[to_lower_camel_case(field)] = value
+    return d
+
+
+def build_tree(menus: list[Menu], build_node: Callable[[Menu], dict[str, Any]], parent_id: int = 0) -> list[dict]:
+    """
+    按parent_id生成菜单树, 先按父节点分组并按order排序, 再逐层挂载子节点, 整体O(n log n)
+    :param menus:
+    :param build_node: 单个菜单转为字典
+    :param parent_id: 根节点的parent_id
+    :return:
+    """
+    children_map: dict[int, list[Menu]] = {}
+    for menu in menus:
+        children_map.setdefault(menu.parent_id, []).append(menu)
+    for children in children_map.values():
+        children.sort(key=lambda m: m.order)
+
+    tree: list[dict] = []
+    visited: set[int] = set()
+    queue: deque[tuple[list[dict], int]] = deque([(tree, parent_id)])
+    while queue:
+        siblings, pid = queue.popleft()
+        for menu in children_map.get(pid, []):
+            if menu.id in visited:  # 防止parent_id成环
+                continue
+            visited.add(menu.id)
+            node = build_node(menu)
+            siblings.append(node)
+            if menu.id in children_map:
+                node["children"] = []
+                queue.append((node["children"], menu.id))
+    return tree
+
+
 async def insert_log(log_type: LogType, log_detail_type: LogDetailType, by_user_id: int | None = None):
     """
     插入日志
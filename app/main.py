@@ -5,10 +5,11 @@ from loguru import logger
 from fastapi import FastAPI,APIRouter
 
 from app.api.v1 import health_check,route,article,auth
-from app.api.v1.system_manage import logs,menus,roles,users
+from app.api.v1.system_manage import apis,logs,menus,roles,users
 from app.settings.config import APP_SETTINGS
 
 from app.core.init_app import (
+    init_apis,
     init_menus,
     init_users,
     make_middlewares,
@@ -19,18 +20,23 @@ from app.core.init_app import (
 
 from app.sqlmodel.admin import Log
 from app.sqlmodel.base import LogType, LogDetailType
-# from app.core.dependency import DependPermission
-from app.core.dependency import DependAuth
+from app.core.dependency import DependAuth, DependPermission
+from app.core.invalidation import invalidation_bus
+from app.core.permission import permission_engine
+from app.core.log_writer import api_log_writer
+from app.core.log_partition import log_partition_manager
+from app.core.security import password_hasher
 
 router = APIRouter()
 
 router.include_router(router=health_check.router, tags=["Healthy Check"], prefix="/health-check")
 router.include_router(router=route.router, tags=["route"], prefix="/route")
 router.include_router(router=auth.router, tags=["auth"], prefix="/auth")
-router.include_router(router=logs.router, tags=["日志管理"], prefix="/system-manage", dependencies=[DependAuth])
-router.include_router(router=users.router, tags=["用户管理"], prefix="/system-manage", dependencies=[DependAuth])
-router.include_router(router=menus.router, tags=["菜单管理"], prefix="/system-manage", dependencies=[DependAuth])
-router.include_router(router=roles.router, tags=["角色管理"], prefix="/system-manage", dependencies=[DependAuth])
+router.include_router(router=logs.router, tags=["日志管理"], prefix="/system-manage", dependencies=[DependPermission])
+router.include_router(router=users.router, tags=["用户管理"], prefix="/system-manage", dependencies=[DependPermission])
+router.include_router(router=menus.router, tags=["菜单管理"], prefix="/system-manage", dependencies=[DependPermission])
+router.include_router(router=roles.router, tags=["角色管理"], prefix="/system-manage", dependencies=[DependPermission])
+router.include_router(router=apis.router, tags=["API管理"], prefix="/system-manage", dependencies=[DependPermission])
 router.include_router(router=article.router, tags=["文章管理"], dependencies=[DependAuth])
 
 
@@ -58,10 +64,19 @@ application: FastAPI):
         await modify_db()
         await init_menus()
         await init_users()
+        await init_apis(application)
+        await permission_engine.reload()
+        await invalidation_bus.start()
+        await log_partition_manager.start()
         await Log.create(log_type=LogType.SystemLog, log_detail_type=LogDetailType.SystemStart)
+        await api_log_writer.start()
 
         yield
     finally:
+        await invalidation_bus.stop()
+        await api_log_writer.stop()
+        password_hasher.shutdown()
+        await log_partition_manager.stop()
         end_time = time.time()
         runtime = end_time - start_time
         logger.info(f"App {application.title} runtime: {runtime} seconds")  # noqa
@@ -0,0 +1,24 @@
+from typing import Annotated
+
+from pydantic import BaseModel, Field
+
+from app.sqlmodel.base import MethodType, StatusType
+
+
+class ApiBase(BaseModel):
+    api_path: str = Field(alias="apiPath", description="API路径")
+    api_method: MethodType = Field(alias="apiMethod", description="请求方法")
+    summary: Annotated[str | None, Field(description="请求简介")] = None
+    tags: Annotated[list[str] | None, Field(description="API标签")] = None
+    status: Annotated[StatusType | None, Field()] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class ApiCreate(ApiBase):
+    ...
+
+
+class ApiUpdate(ApiBase):
+    ...
@@ -27,5 +27,6 @@ class ArticleSearch(BaseModel):
     body: Optional[str] = None
     author_name: Optional[str] = None
     time_range: Optional[str] = None  # 格式为时间戳字符串: "start,end"
+    with_body: Optional[bool] = False  # 列表是否返回正文body
     current: Optional[int] = 1
     size: Optional[int] = 10
\ No newline at end of file
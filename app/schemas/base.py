@@ -38,12 +38,17 @@ class SuccessExtra(Custom):
         code: str | int = "0000",
         msg: str = "OK",
         data: Any = None,
-        total: int = 0,
+        total: int | None = 0,
         current: int = 1,
         size: int = 20,
         **kwargs,
     ):
         # kwargs.update({"total": total, "current": current, "size": size})
         if isinstance(data, dict):
-            data.update({"total": total, "current": current, "size": size})
+            data.update({
+                "total": total,
+                "totalApproximate": getattr(total, "approximate", False),
+                "current": current,
+                "size": size,
+            })
         super().__init__(code=code, msg=msg, data=data, status_code=200, **kwargs)
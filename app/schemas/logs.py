@@ -43,6 +43,9 @@ class LogSearch(BaseModel):
     # response_data: Annotated[str | None, Field(alias="responseData", description="响应数据")] = None
     time_range: Annotated[str | None, Field(alias="timeRange", description="时间范围, 逗号隔开")] = None
     response_code: Annotated[str | None, Field(alias="responseCode", description="响应业务码")] = None
+    after_id: Annotated[int | None, Field(alias="afterId", description="游标分页, 下一页游标")] = None
+    before_id: Annotated[int | None, Field(alias="beforeId", description="游标分页, 上一页游标")] = None
+    with_total: Annotated[bool | None, Field(alias="withTotal", description="游标分页时是否统计总数")] = False
 
 
 class LogCreate(BaseLog):
@@ -0,0 +1,38 @@
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+from app.services.crud import CRUDBase
+from app.sqlmodel.admin import Api
+from app.sqlmodel.base import MethodType
+from app.schemas.apis import ApiCreate, ApiUpdate
+
+
+class ApiController(CRUDBase[Api, ApiCreate, ApiUpdate]):
+    invalidation_entity = "api"
+
+    def __init__(self):
+        super().__init__(model=Api)
+
+    async def refresh_api(self, app: FastAPI) -> int:
+        """
+        根据应用路由补全API表, 已有的API保留(保留状态和角色授权)
+        :return: 新增的API数量
+        """
+        existing = set(await self.model.all().values_list("api_path", "api_method"))
+        methods = {m.value for m in MethodType}
+        new_apis = []
+        for route in app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            for method in route.methods:
+                method = method.lower()
+                if method not in methods or (route.path, method) in existing:
+                    continue
+                existing.add((route.path, method))
+                new_apis.append(self.model(api_path=route.path, api_method=MethodType(method), summary=route.summary, tags=list(route.tags)))
+        if new_apis:
+            await self.model.bulk_create(new_apis)
+        return len(new_apis)
+
+
+api_controller = ApiController()
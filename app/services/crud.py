@@ -1,31 +1,182 @@
-from typing import Any, Generic, NewType, TypeVar
+from __future__ import annotations
 
+import hashlib
+import time
+from typing import Any, Generic, Literal, TypeVar
+
+import orjson
 from pydantic import BaseModel
 from pydantic.main import IncEx
+from tortoise.exceptions import DoesNotExist
 from tortoise.expressions import Q
 from tortoise.models import Model
+from tortoise.queryset import QuerySet
+from tortoise.transactions import in_transaction
+
+from app.core.invalidation import invalidation_bus
+from app.settings.config import APP_SETTINGS
+
+CountStrategy = Literal["exact", "estimated", "cached"]
+
+
+class Total(int):
+    """总数, approximate为True时是估算值"""
 
-Total = NewType("Total", int)
+    def __new__(cls, value: int, approximate: bool = False) -> "Total":
+        obj = super().__new__(cls, value)
+        obj.approximate = approximate
+        return obj
+
+
+# 按查询条件缓存的总数 {key: (过期时间, 总数)}
+_count_cache: dict[str, tuple[float, int]] = {}
 ModelType = TypeVar("ModelType", bound=Model)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    invalidation_entity: str | None = None  # 缓存失效事件的实体名, 有缓存订阅的controller才设置, None时不发布
+
     def __init__(self, model: type[ModelType]):
         self.model = model
 
     async def get(self, id: int) -> ModelType:
         return await self.model.get(id=id)
 
-    async def list(self, page: int, page_size: int, search: Q = Q(), order: list[str] | None = None) -> tuple[Total, list[ModelType]]:
+    async def publish_invalidation(self, id: int | None = None) -> None:
+        if self.invalidation_entity is not None:
+            await invalidation_bus.publish(self.invalidation_entity, id)
+
+    async def count(self, query: QuerySet[ModelType], strategy: CountStrategy = "exact", filtered: bool = True) -> Total:
+        """
+        统计总数
+        :param strategy: exact: COUNT(*); estimated: 无条件时取pg_class.reltuples, 有条件时取EXPLAIN估算行数,
+                         估算值小于COUNT_ESTIMATE_MIN时仍精确统计; cached: 按查询条件缓存精确总数COUNT_CACHE_TTL秒
+        :param filtered: 查询是否带条件
+        """
+        if strategy == "estimated":
+            db = self.model._meta.db
+            if not filtered:
+                # 分区表的父表没有统计信息, 加上各分区的行数
+                rows = await db.execute_query_dict(
+                    "SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::BIGINT AS estimate FROM pg_class c "
+                    "WHERE c.oid = $1::regclass OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = $1::regclass)",
+                    [f"{self.model._meta.schema}.{self.model._meta.db_table}"],
+                )
+                estimate = int(rows[0]["estimate"])
+            else:
+                rows = await db.execute_query_dict(f"EXPLAIN (FORMAT JSON) {query.sql(params_inline=True)}")
+                plan = rows[0]["QUERY PLAN"]
+                if isinstance(plan, str):
+                    plan = orjson.loads(plan)
+                estimate = int(plan[0]["Plan"]["Plan Rows"])
+            if estimate >= APP_SETTINGS.COUNT_ESTIMATE_MIN:
+                return Total(estimate, approximate=True)
+        elif strategy == "cached":
+            key = hashlib.sha1(query.sql(params_inline=True).encode()).hexdigest()
+            now = time.monotonic()
+            cached = _count_cache.get(key)
+            if cached and cached[0] > now:
+                return Total(cached[1], approximate=True)
+            total = await query.count()
+            if len(_count_cache) >= APP_SETTINGS.COUNT_CACHE_SIZE:
+                _count_cache.clear()
+            _count_cache[key] = (now + APP_SETTINGS.COUNT_CACHE_TTL, total)
+            return Total(total)
+        return Total(await query.count())
+
+    async def list(
+        self,
+        page: int,
+        page_size: int,
+        search: Q = Q(),
+        order: list[str] | None = None,
+        values: dict[str, str] | None = None,
+        count: CountStrategy = "exact",
+    ) -> tuple[Total, list[Any]]:
+        """
+        :param values: 只查询指定字段, {返回字段名: 字段路径}, 可跨关联(如api_log__request_url), 返回字典列表
+        :param count: 总数统计方式, 见count
+        """
         if order is None:
             order = []
 
         query = self.model.filter(search)
-        total = await query.count()
-        result = await query.offset((page - 1) * page_size).limit(page_size).order_by(*order)
-        return Total(total), result
+        total = await self.count(query, count, filtered=bool(search.children or search.filters))
+        query = query.offset((page - 1) * page_size).limit(page_size).order_by(*order)
+        result = await (query.values(**values) if values else query)
+        return total, result
+
+    async def list_by_cursor(
+        self,
+        page_size: int,
+        search: Q = Q(),
+        after_id: int | None = None,
+        before_id: int | None = None,
+        with_total: bool = False,
+        values: dict[str, str] | None = None,
+    ) -> tuple[Total | None, list[Any], int | None, int | None]:
+        """
+        游标分页, 按id倒序, 通过主键条件代替OFFSET
+        :param after_id: 下一页, 返回id小于after_id的记录
+        :param before_id: 上一页, 返回id大于before_id的记录
+        :param with_total: 是否统计总数
+        :param values: 同list, 需要包含id
+        :return: 总数, 记录, 下一页游标, 上一页游标
+        """
+        query = self.model.filter(search)
+        total = await self.count(query) if with_total else None
+
+        if before_id is not None:
+            query = query.filter(id__gt=before_id).order_by("id").limit(page_size + 1)
+        else:
+            if after_id is not None:
+                query = query.filter(id__lt=after_id)
+            query = query.order_by("-id").limit(page_size + 1)
+        result = await (query.values(**values) if values else query)
+        ids = [row["id"] if values else row.pk for row in result]
+
+        has_more = len(result) > page_size
+        if before_id is not None:
+            result, ids = result[:page_size][::-1], ids[:page_size][::-1]
+            next_cursor = ids[-1] if ids else None
+            prev_cursor = ids[0] if ids and has_more else None
+        else:
+            result, ids = result[:page_size], ids[:page_size]
+            next_cursor = ids[-1] if ids and has_more else None
+            prev_cursor = ids[0] if ids and after_id is not None else None
+        return total, result, next_cursor, prev_cursor
+
+    async def sync_relation(self, obj: ModelType, relation: str, values: list[Any], key: str = "id") -> bool:
+        """
+        把多对多关系同步为values, 只增删有差异的关联
+        在同一事务中锁定obj所在行, 再解析values、读取当前关联并批量删除和插入, 并发同步同一对象时依次执行
+        :param relation: 多对多字段名, 如roles
+        :param values: 目标关联的key值列表
+        :param key: values对应的字段, 如id, role_code
+        :return: 是否有变更
+        """
+        manager = getattr(obj, relation)
+        related_model = manager.remote_model
+        values = set(values)
+        async with in_transaction(self.model._meta.default_connection) as conn:
+            await self.model.select_for_update().using_db(conn).get(pk=obj.pk)
+            targets = await related_model.filter(**{f"{key}__in": values}).using_db(conn) if values else []
+            missing = values - {getattr(target, key) for target in targets}
+            if missing:
+                raise DoesNotExist(f"{related_model.__name__} {key} does not exist: {sorted(missing, key=str)}")
+
+            current = await manager.all().using_db(conn)
+            current_ids = {item.pk for item in current}
+            target_ids = {target.pk for target in targets}
+            to_remove = [item for item in current if item.pk not in target_ids]
+            to_add = [target for target in targets if target.pk not in current_ids]
+            if to_remove:
+                await manager.remove(*to_remove, using_db=conn)
+            if to_add:
+                await manager.add(*to_add, using_db=conn)
+        return bool(to_remove or to_add)
 
     async def create(self, obj_in: CreateSchemaType, exclude: IncEx = None) -> ModelType:
         if isinstance(obj_in, dict):
@@ -34,6 +185,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             obj_dict = obj_in.model_dump(exclude_unset=True, exclude_none=True, exclude=exclude)
         obj: ModelType = self.model(**obj_dict)
         await obj.save()
+        await self.publish_invalidation(obj.id)
         return obj
 
     async def update(self, id: int, obj_in: UpdateSchemaType | dict[str, Any], exclude: IncEx = None) -> ModelType:
@@ -45,8 +197,10 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj = obj.update_from_dict(obj_dict)
 
         await obj.save()
+        await self.publish_invalidation(id)
         return obj
 
     async def remove(self, id: int) -> None:
         obj = await self.get(id=id)
         await obj.delete()
+        await self.publish_invalidation(id)
@@ -1,17 +1,122 @@
 from loguru import logger
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
 
+from app.core.exceptions import HTTPException
 from app.services.crud import CRUDBase
 from app.sqlmodel.admin import Button, Menu
 from app.schemas.menus import ButtonBase, MenuCreate, MenuUpdate
 
 
+# 按materialized path重建全部菜单路径, parent_id不存在的菜单保持为空
+REBUILD_PATHS_SQL = """
+WITH RECURSIVE tree AS (
+    SELECT id, '/' || id || '/' AS path FROM menus WHERE parent_id = 0
+    UNION ALL
+    SELECT m.id, tree.path || m.id || '/' FROM menus m JOIN tree ON m.parent_id = tree.id
+)
+UPDATE menus SET path = tree.path FROM tree WHERE menus.id = tree.id AND menus.path IS DISTINCT FROM tree.path
+"""
+
+
 class MenuController(CRUDBase[Menu, MenuCreate, MenuUpdate]):
+    invalidation_entity = "menu"
+
     def __init__(self):
         super().__init__(model=Menu)
 
-
     @staticmethod
-    async def update_buttons_by_code(menu: Menu, buttons: list[ButtonBase] | None = None) -> bool:
+    def path_ids(path: str) -> list[int]:
+        """路径中的菜单id, 从根到自身"""
+        return [int(i) for i in path.strip("/").split("/") if i]
+
+    async def get_path(self, menu_id: int) -> str:
+        if menu_id == 0:
+            return "/"
+        parent = await self.model.filter(id=menu_id).values_list("path", flat=True)
+        if not parent:
+            raise HTTPException(code="4040", msg=f"The parent menu {menu_id} does not exist")
+        return parent[0]  # type: ignore
+
+    async def rebuild_paths(self) -> None:
+        await self.model._meta.db.execute_script(REBUILD_PATHS_SQL)
+
+    async def create(self, obj_in: MenuCreate | dict, exclude=None) -> Menu:  # type: ignore
+        if isinstance(obj_in, dict):
+            obj_dict = obj_in
+        else:
+            obj_dict = obj_in.model_dump(exclude_unset=True, exclude_none=True, exclude=exclude)
+        parent_path = await self.get_path(obj_dict.get("parent_id") or 0)
+        # 菜单和path在同一事务中写入后再发布失效事件, 避免按旧path重建路由缓存
+        async with in_transaction(self.model._meta.default_connection) as conn:
+            obj = self.model(**obj_dict)
+            await obj.save(using_db=conn)
+            obj.path = f"{parent_path}{obj.id}/"
+            await obj.save(update_fields=["path"], using_db=conn)
+        await self.publish_invalidation(obj.id)
+        return obj
+
+    async def update(self, id: int, obj_in: MenuUpdate | dict, exclude=None) -> Menu:  # type: ignore
+        obj = await self.get(id=id)
+        old_path = obj.path
+        if isinstance(obj_in, dict):
+            obj_dict = obj_in
+        else:
+            obj_dict = obj_in.model_dump(exclude_unset=True, exclude_none=True, exclude=exclude)
+        parent_id = obj_dict.get("parent_id")
+        new_path = old_path
+        if parent_id is not None:
+            new_path = f"{await self.get_path(parent_id)}{id}/"
+            if old_path and new_path != old_path and new_path.startswith(old_path):
+                raise HTTPException(code="4000", msg="A menu cannot be moved under itself or its descendants")
+
+        async with in_transaction(self.model._meta.default_connection) as conn:
+            obj = obj.update_from_dict(obj_dict)
+            await obj.save(using_db=conn)
+            if new_path != old_path:
+                if old_path:
+                    # 整棵子树的路径前缀一起替换
+                    await conn.execute_query(
+                        "UPDATE menus SET path = $1 || substr(path, $2) WHERE path LIKE $3",
+                        [new_path, len(old_path) + 1, f"{old_path}%"],
+                    )
+                else:
+                    await self.model.filter(id=id).using_db(conn).update(path=new_path)
+                obj.path = new_path
+        await self.publish_invalidation(id)
+        return obj
+
+    async def get_ancestor_ids(self, menu_ids: list[int]) -> set[int]:
+        """所有祖先菜单id, 不含menu_ids本身"""
+        paths = await self.model.filter(id__in=menu_ids).values_list("path", flat=True)
+        ancestor_ids = {menu_id for path in paths for menu_id in self.path_ids(path)}  # type: ignore
+        return ancestor_ids - set(menu_ids)
+
+    async def with_ancestors(self, menus: list[Menu]) -> list[Menu]:
+        """补全菜单的所有祖先菜单, 祖先id取自path, 一次查询取回"""
+        menu_ids = {menu.id for menu in menus}
+        ancestor_ids = {menu_id for menu in menus for menu_id in self.path_ids(menu.path)} - menu_ids
+        if not ancestor_ids:
+            return list(menus)
+        return list(menus) + await self.model.filter(id__in=ancestor_ids)
+
+    async def remove(self, id: int) -> None:
+        await self.remove_many([id])
+
+    async def remove_many(self, ids: list[int]) -> list[int]:
+        """删除菜单及其整棵子树, 返回删除的菜单id"""
+        paths = await self.model.filter(id__in=ids).values_list("path", flat=True)
+        if not paths:
+            return []
+        q = Q(id__in=ids)
+        for path in paths:
+            q |= Q(path__startswith=path)
+        deleted_ids = await self.model.filter(q).values_list("id", flat=True)
+        await self.model.filter(id__in=deleted_ids).delete()
+        await self.publish_invalidation()
+        return list(deleted_ids)  # type: ignore
+
+    async def update_buttons_by_code(self, menu: Menu, buttons: list[ButtonBase] | None = None) -> bool:
         if not buttons:
             return False
 
@@ -19,15 +124,15 @@ class MenuController(CRUDBase[Menu, MenuCreate, MenuUpdate]):
 
         menu_buttons = [button.button_code for button in buttons]
 
-        for button_code in set(existing_buttons) - set(menu_buttons):
-            logger.error(f"Button Deleted {button_code}")
-            await Button.filter(button_code=button_code).delete()
+        if deleted_codes := set(existing_buttons) - set(menu_buttons):
+            logger.error(f"Button Deleted {deleted_codes}")
+            await Button.filter(button_code__in=deleted_codes).delete()
 
-        await menu.buttons.clear()
         for button in buttons:
-            button_obj, _ = await Button.update_or_create(button_code=button.button_code, defaults=dict(button_desc=button.button_desc))
-            await menu.buttons.add(button_obj)
+            await Button.update_or_create(button_code=button.button_code, defaults=dict(button_desc=button.button_desc))
+        await self.sync_relation(menu, "buttons", menu_buttons, key="button_code")
 
+        await self.publish_invalidation(menu.id)
         return True
 
 
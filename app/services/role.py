@@ -1,9 +1,11 @@
 from app.services.crud import CRUDBase
-from app.sqlmodel.admin import  Button, Role
+from app.sqlmodel.admin import Role
 from app.schemas.roles import RoleCreate, RoleUpdate
 
 
 class RoleController(CRUDBase[Role, RoleCreate, RoleUpdate]):
+    invalidation_entity = "role"
+
     def __init__(self):
         super().__init__(model=Role)
 
@@ -19,15 +21,12 @@ class RoleController(CRUDBase[Role, RoleCreate, RoleUpdate]):
     async def get_all(self) -> list[Role]:
         return await self.model.all()
 
-    @staticmethod
-    async def update_buttons_by_code(role: Role, buttons_codes: list[str] | None = None) -> bool:
+    async def update_buttons_by_code(self, role: Role, buttons_codes: list[str] | None = None) -> bool:
         if not buttons_codes:
             return False
 
-        await role.buttons.clear()
-        for button_code in buttons_codes:
-            button_obj = await Button.get(button_code=button_code)
-            await role.buttons.add(button_obj)
+        if await self.sync_relation(role, "buttons", buttons_codes, key="button_code"):
+            await self.publish_invalidation(role.id)
         return True
 
 
@@ -6,10 +6,12 @@ from app.sqlmodel.admin import Role, User, Log, StatusType
 from app.sqlmodel.base import LogType, LogDetailType
 from app.schemas.login import CredentialsSchema
 from app.schemas.users import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import password_hasher
 
 
 class UserController(CRUDBase[User, UserCreate, UserUpdate]):
+    invalidation_entity = "user"
+
     def __init__(self):
         super().__init__(model=User)
 
@@ -20,7 +22,7 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
         return await self.model.filter(user_name=user_name).first()
 
     async def create(self, obj_in: UserCreate) -> User:  # type: ignore
-        obj_in.password = get_password_hash(password=obj_in.password)
+        obj_in.password = await password_hasher.hash(obj_in.password)
         if not obj_in.nick_name:
             obj_in.nick_name = obj_in.user_name
         obj = await super().create(obj_in, exclude={"roles"})
@@ -28,11 +30,20 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
 
     async def update(self, user_id: int, obj_in: UserUpdate) -> User:  # type: ignore
         if obj_in.password:
-            obj_in.password = get_password_hash(password=obj_in.password)
+            obj_in.password = await password_hasher.hash(obj_in.password)
         else:
             obj_in.password = None
         return await super().update(id=user_id, obj_in=obj_in, exclude={"roles"})
 
+    async def get_role_codes(self, user_ids: list[int]) -> dict[int, list[str]]:
+        """一次查询取回多个用户的角色编码 {user_id: [role_code]}"""
+        role_codes: dict[int, list[str]] = {user_id: [] for user_id in user_ids}
+        if user_ids:
+            rows = await Role.filter(user_roles__id__in=user_ids).values_list("user_roles__id", "role_code")
+            for user_id, role_code in rows:
+                role_codes[user_id].append(role_code)
+        return role_codes
+
     async def update_last_login(self, user_id: int) -> None:
         user = await self.model.get(id=user_id)
         user.last_login = datetime.now()
@@ -43,7 +54,7 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
         if not user:
             await Log.create(log_type=LogType.UserLog, by_user=None, log_detail_type=LogDetailType.UserLoginUserNameVaild)
             raise HTTPException(code="4040", msg="Incorrect username or password!")
-        verified = verify_password(credentials.password, user.password)
+        verified = await password_hasher.verify(credentials.password, user.password)
         if not verified:
             await Log.create(log_type=LogType.UserLog, by_user=None, log_detail_type=LogDetailType.UserLoginErrorPassword)
             raise HTTPException(code="4040", msg="Incorrect username or password!")
@@ -52,26 +63,20 @@ class UserController(CRUDBase[User, UserCreate, UserUpdate]):
             raise HTTPException(code="4030", msg="This user has been disabled.")
         return user
 
-    @staticmethod
-    async def update_roles(user: User, role_ids: list[int] | None = None) -> bool:
+    async def update_roles(self, user: User, role_ids: list[int] | None = None) -> bool:
         if not role_ids:
             return False
 
-        await user.roles.clear()
-        for role_id in role_ids:
-            role_obj = await Role.get(id=role_id)
-            await user.roles.add(role_obj)
+        if await self.sync_relation(user, "roles", role_ids):
+            await self.publish_invalidation(user.id)
         return True
 
-    @staticmethod
-    async def update_roles_by_code(user: User, roles_codes: list[str] | None = None) -> bool:
+    async def update_roles_by_code(self, user: User, roles_codes: list[str] | None = None) -> bool:
         if not roles_codes:
             return False
 
-        await user.roles.clear()
-        for role_code in roles_codes:
-            role_obj = await Role.get(role_code=role_code)
-            await user.roles.add(role_obj)
+        if await self.sync_relation(user, "roles", roles_codes, key="role_code"):
+            await self.publish_invalidation(user.id)
         return True
 
 
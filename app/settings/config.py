@@ -15,9 +15,33 @@ class Settings(BaseSettings):
     CORS_ALLOW_METHODS: list = ["*"]
     CORS_ALLOW_HEADERS: list = ["*"]
 
-    ADD_LOG_ORIGINS_INCLUDE: list = ["*"]  # APILoggerMiddleware and APILoggerAddResponseMiddleware
+    # APILoggerMiddleware and APILoggerAddResponseMiddleware
+    # 规则: 子串匹配; 含*?[为通配符匹配完整路径; re:开头为正则; 可加请求方法前缀, 如 "GET,POST /api/v1/auth/*"
+    ADD_LOG_ORIGINS_INCLUDE: list = ["*"]
     ADD_LOG_ORIGINS_DECLUDE: list = ["/system-manage", "/redoc", "/doc", "/openapi.json"]
 
+    # API日志采样策略, 按顺序取第一条匹配的规则, 如:
+    # {"route": "GET /api/v1/route/user-routes", "sample_rate": 0.01, "keep_request": False, "keep_response": False}
+    API_LOG_POLICIES: list[dict] = []
+    API_LOG_SLOW_THRESHOLD: float = 1.0  # 慢请求阈值(秒), 慢请求和出错请求不受采样影响总是记录
+    API_LOG_WRITE_MODE: str = "batch"  # batch: 入队批量写入; direct: 响应结束后在后台任务中单条写入
+    API_LOG_REQUEST_BODY_LIMIT: int = 64 * 1024  # 记录请求体的最大字节数, 超过只记录大小
+    API_LOG_RESPONSE_BODY_LIMIT: int = 64 * 1024  # 记录响应体的最大字节数, 超过只记录大小和业务码
+    API_LOG_QUEUE_SIZE: int = 10000  # API日志队列上限, 队列满时丢弃
+    API_LOG_BATCH_SIZE: int = 500  # 单次批量写入条数
+    API_LOG_FLUSH_INTERVAL: float = 1.0  # 批量写入最长等待时间(秒)
+
+    # api_logs/logs按create_time按月分区
+    LOG_PARTITION_PREMAKE_MONTHS: int = 2  # 预建未来月份分区数
+    LOG_RETENTION_MONTHS: int = 0  # 日志保留月数, 0为不清理; logs表同时保存用户和管理日志, 按需开启
+    LOG_PARTITION_DETACH_ONLY: bool = True  # 过期分区只分离不删除, False时直接DROP
+    LOG_PARTITION_CHECK_INTERVAL: float = 60 * 60 * 6  # 分区维护间隔(秒)
+
+    # CRUDBase.list 总数统计
+    COUNT_ESTIMATE_MIN: int = 10000  # estimated估算值小于该值时仍精确统计
+    COUNT_CACHE_TTL: float = 30  # cached缓存时间(秒)
+    COUNT_CACHE_SIZE: int = 1024  # cached最多缓存的查询条件数
+
     # DEBUG: bool = True
 
     PROJECT_ROOT: Path = Path(__file__).resolve().parent.parent
@@ -27,6 +51,16 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 12  # 12 hours
     JWT_REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    JWT_CACHE_SIZE: int = 10000  # 已验证token缓存数量, 0为不缓存
+    PRINCIPAL_CACHE_TTL: float = 60  # 用户身份(角色、按钮)缓存时间(秒), 变更时会主动失效
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    API_PERMISSION_ENABLED: bool = False  # 是否启用API权限校验, 启用前需在角色管理中为角色分配API
+    ROUTE_CACHE_SIZE: int = 1000  # 路由缓存的角色组合数量
+    INVALIDATION_CHANNEL: str = "cache_invalidation"  # 多worker缓存失效广播的NOTIFY频道
+    INVALIDATION_CHECK_INTERVAL: float = 5  # 监听连接检查间隔(秒), 断开后重连并清空缓存
+    PASSWORD_HASH_MODE: str = "thread"  # 密码哈希执行方式: thread 线程池; process 进程池
+    PASSWORD_HASH_WORKERS: int = 4  # 密码哈希并发数
+    PASSWORD_HASH_QUEUE_SIZE: int = 64  # 等待中的密码哈希上限, 超过时登录直接返回4290
     DB_HOST: str
     DB_PORT: str
     DB_USER: str
@@ -1,6 +1,6 @@
 from tortoise import fields
 
-from app.sqlmodel.base import BaseModel, GenderType, IconType, MenuType,StatusType, LogType, LogDetailType
+from app.sqlmodel.base import BaseModel, GenderType, IconType, MenuType, MethodType, StatusType, LogType, LogDetailType
 
 
 class User(BaseModel):
@@ -31,6 +31,7 @@ class Role(BaseModel):
     status = fields.CharEnumField(enum_type=StatusType, default=StatusType.enable, description="状态")
     menus = fields.ManyToManyField("app_system.Menu", related_name="role_menus")
     buttons = fields.ManyToManyField("app_system.Button", related_name="role_buttons")
+    apis = fields.ManyToManyField("app_system.Api", related_name="role_apis")
     create_time = fields.DatetimeField(auto_now_add=True)
     update_time = fields.DatetimeField(auto_now=True)
 
@@ -41,6 +42,22 @@ class Role(BaseModel):
 
 
 
+class Api(BaseModel):
+    id = fields.IntField(pk=True, description="API ID")
+    api_path = fields.CharField(max_length=500, description="API路径, 路由模板, 如/api/v1/system-manage/users/{user_id}")
+    api_method = fields.CharEnumField(MethodType, description="请求方法")
+    summary = fields.CharField(max_length=500, null=True, description="请求简介")
+    tags = fields.JSONField(null=True, description="API标签")
+    status = fields.CharEnumField(enum_type=StatusType, default=StatusType.enable, description="状态")
+    create_time = fields.DatetimeField(auto_now_add=True)
+    update_time = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "apis"
+        schema = "admin"
+        unique_together = (("api_path", "api_method"),)
+
+
 class Menu(BaseModel):
     id = fields.IntField(pk=True, description="菜单ID")
     menu_name = fields.CharField(max_length=100, description="菜单名称")
@@ -54,6 +71,7 @@ class Menu(BaseModel):
     component = fields.CharField(null=True, max_length=100, description="路由组件")
 
     parent_id = fields.IntField(default=0, max_length=10, description="父菜单ID")
+    path = fields.CharField(default="", max_length=500, description="菜单路径, 从根到自身的ID, 如/1/5/12/")
     i18n_key = fields.CharField(max_length=100, description="用于国际化的展示文本，优先级高于title")
 
     icon = fields.CharField(null=True, max_length=100, description="图标名称")
@@ -98,7 +116,8 @@ class Log(BaseModel):
     log_type = fields.CharEnumField(LogType, description="日志类型")
     by_user = fields.ForeignKeyField("app_system.User", null=True, on_delete=fields.NO_ACTION, description="操作人")
     log_detail_type = fields.CharEnumField(LogDetailType, null=True, description="日志详情类型")
-    api_log = fields.ForeignKeyField("app_system.APILog", null=True, on_delete=fields.SET_NULL, description="API日志")
+    # api_logs按create_time分区后主键为(id, create_time), 不能再建外键约束
+    api_log = fields.ForeignKeyField("app_system.APILog", null=True, on_delete=fields.SET_NULL, db_constraint=False, description="API日志")
     create_time = fields.DatetimeField(auto_now_add=True, description="创建时间")
 
     class Meta:
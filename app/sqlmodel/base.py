@@ -23,6 +23,7 @@ class LogDetailType(str, Enum):
     1000-1999 内置
     1100-1199 系统
     1200-1299 用户
+    1300-1399 API
     1400-1499 菜单
     1500-1599 角色
     1600-1699 用户
@@ -37,6 +38,8 @@ class LogDetailType(str, Enum):
     UserLoginErrorPassword = "1212"
     UserLoginForbid = "1213"
 
+    ApiGetList = "1301"
+
     MenuGetList = "1401"
     MenuGetTree = "1402"
     MenuGetPages = "1403"
@@ -75,6 +78,14 @@ class StatusType(str, Enum):
     disable = "2"
 
 
+class MethodType(str, Enum):
+    GET = "get"
+    POST = "post"
+    PUT = "put"
+    PATCH = "patch"
+    DELETE = "delete"
+
+
 class GenderType(str, Enum):
     male = "1"
     female = "2"
@@ -0,0 +1,71 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "logs" DROP CONSTRAINT IF EXISTS "logs_api_log_id_fkey";
+ALTER TABLE "api_logs" RENAME TO "api_logs_old";
+ALTER TABLE "api_logs_old" RENAME CONSTRAINT "api_logs_pkey" TO "api_logs_old_pkey";
+ALTER TABLE "logs" RENAME TO "logs_old";
+ALTER TABLE "logs_old" RENAME CONSTRAINT "logs_pkey" TO "logs_old_pkey";
+ALTER TABLE "logs_old" RENAME CONSTRAINT "logs_by_user_id_fkey" TO "logs_old_by_user_id_fkey";
+CREATE TABLE "api_logs" (
+    LIKE "api_logs_old" INCLUDING DEFAULTS INCLUDING COMMENTS,
+    PRIMARY KEY ("id", "create_time")
+) PARTITION BY RANGE ("create_time");
+ALTER SEQUENCE "api_logs_id_seq" OWNED BY "api_logs"."id";
+CREATE TABLE "logs" (
+    LIKE "logs_old" INCLUDING DEFAULTS INCLUDING COMMENTS,
+    PRIMARY KEY ("id", "create_time")
+) PARTITION BY RANGE ("create_time");
+ALTER SEQUENCE "logs_id_seq" OWNED BY "logs"."id";
+ALTER TABLE "logs" ADD CONSTRAINT "logs_by_user_id_fkey" FOREIGN KEY ("by_user_id") REFERENCES "users" ("id") ON DELETE NO ACTION;
+DO $$
+DECLARE
+    parent TEXT;
+    month_start DATE;
+    month_end DATE := date_trunc('month', CURRENT_DATE) + INTERVAL '3 month';
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['api_logs', 'logs'] LOOP
+        EXECUTE format(
+            'SELECT COALESCE(MIN(create_time), CURRENT_DATE) FROM %I', parent || '_old'
+        ) INTO month_start;
+        month_start := date_trunc('month', month_start);
+        WHILE month_start < month_end LOOP
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                parent || '_p' || to_char(month_start, 'YYYYMM'), parent, month_start, month_start + INTERVAL '1 month'
+            );
+            month_start := month_start + INTERVAL '1 month';
+        END LOOP;
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', parent || '_default', parent);
+    END LOOP;
+END $$;
+INSERT INTO "api_logs" SELECT * FROM "api_logs_old";
+INSERT INTO "logs" SELECT * FROM "logs_old";
+DROP TABLE "logs_old";
+DROP TABLE "api_logs_old";"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "api_logs" RENAME TO "api_logs_partitioned";
+ALTER TABLE "api_logs_partitioned" RENAME CONSTRAINT "api_logs_pkey" TO "api_logs_partitioned_pkey";
+ALTER TABLE "logs" RENAME TO "logs_partitioned";
+ALTER TABLE "logs_partitioned" RENAME CONSTRAINT "logs_pkey" TO "logs_partitioned_pkey";
+CREATE TABLE "api_logs" (
+    LIKE "api_logs_partitioned" INCLUDING DEFAULTS INCLUDING COMMENTS
+);
+ALTER TABLE "api_logs" ADD PRIMARY KEY ("id");
+ALTER SEQUENCE "api_logs_id_seq" OWNED BY "api_logs"."id";
+CREATE TABLE "logs" (
+    LIKE "logs_partitioned" INCLUDING DEFAULTS INCLUDING COMMENTS
+);
+ALTER TABLE "logs" ADD PRIMARY KEY ("id");
+ALTER SEQUENCE "logs_id_seq" OWNED BY "logs"."id";
+INSERT INTO "api_logs" SELECT * FROM "api_logs_partitioned";
+INSERT INTO "logs" SELECT * FROM "logs_partitioned";
+DROP TABLE "logs_partitioned";
+DROP TABLE "api_logs_partitioned";
+ALTER TABLE "logs" ADD CONSTRAINT "logs_by_user_id_fkey" FOREIGN KEY ("by_user_id") REFERENCES "users" ("id") ON DELETE NO ACTION;
+ALTER TABLE "logs" ADD CONSTRAINT "logs_api_log_id_fkey" FOREIGN KEY ("api_log_id") REFERENCES "api_logs" ("id") ON DELETE SET NULL;"""
@@ -0,0 +1,33 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "apis" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "api_path" VARCHAR(500) NOT NULL,
+    "api_method" VARCHAR(6) NOT NULL,
+    "summary" VARCHAR(500),
+    "tags" JSONB,
+    "status" VARCHAR(1) NOT NULL DEFAULT '1',
+    "create_time" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "update_time" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT "uid_apis_api_pat_4e7c2a" UNIQUE ("api_path", "api_method")
+);
+COMMENT ON COLUMN "apis"."id" IS 'API ID';
+COMMENT ON COLUMN "apis"."api_path" IS 'API路径, 路由模板, 如/api/v1/system-manage/users/{user_id}';
+COMMENT ON COLUMN "apis"."api_method" IS '请求方法';
+COMMENT ON COLUMN "apis"."summary" IS '请求简介';
+COMMENT ON COLUMN "apis"."tags" IS 'API标签';
+COMMENT ON COLUMN "apis"."status" IS '状态';
+CREATE TABLE IF NOT EXISTS "roles_apis" (
+    "roles_id" INT NOT NULL REFERENCES "roles" ("id") ON DELETE CASCADE,
+    "api_id" INT NOT NULL REFERENCES "apis" ("id") ON DELETE CASCADE
+);
+CREATE UNIQUE INDEX IF NOT EXISTS "uidx_roles_apis_roles_i_6b1e0d" ON "roles_apis" ("roles_id", "api_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "roles_apis";
+DROP TABLE IF EXISTS "apis";"""
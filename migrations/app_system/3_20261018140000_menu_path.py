@@ -0,0 +1,20 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "menus" ADD COLUMN IF NOT EXISTS "path" VARCHAR(500) NOT NULL DEFAULT '';
+COMMENT ON COLUMN "menus"."path" IS '菜单路径, 从根到自身的ID, 如/1/5/12/';
+WITH RECURSIVE tree AS (
+    SELECT id, '/' || id || '/' AS path FROM "menus" WHERE parent_id = 0
+    UNION ALL
+    SELECT m.id, tree.path || m.id || '/' FROM "menus" m JOIN tree ON m.parent_id = tree.id
+)
+UPDATE "menus" SET path = tree.path FROM tree WHERE "menus".id = tree.id;
+CREATE INDEX IF NOT EXISTS "idx_menus_path_pattern" ON "menus" ("path" varchar_pattern_ops);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_menus_path_pattern";
+ALTER TABLE "menus" DROP COLUMN IF EXISTS "path";"""
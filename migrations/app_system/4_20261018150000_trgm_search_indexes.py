@@ -0,0 +1,24 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX IF NOT EXISTS "idx_users_user_name_trgm" ON "users" USING GIN ("user_name" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_users_nick_name_trgm" ON "users" USING GIN ("nick_name" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_users_user_phone_trgm" ON "users" USING GIN ("user_phone" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_users_user_email_trgm" ON "users" USING GIN ("user_email" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_users_status" ON "users" ("status");
+CREATE INDEX IF NOT EXISTS "idx_roles_role_name_trgm" ON "roles" USING GIN ("role_name" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_roles_role_code_trgm" ON "roles" USING GIN ("role_code" gin_trgm_ops);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_users_user_name_trgm";
+DROP INDEX IF EXISTS "idx_users_nick_name_trgm";
+DROP INDEX IF EXISTS "idx_users_user_phone_trgm";
+DROP INDEX IF EXISTS "idx_users_user_email_trgm";
+DROP INDEX IF EXISTS "idx_users_status";
+DROP INDEX IF EXISTS "idx_roles_role_name_trgm";
+DROP INDEX IF EXISTS "idx_roles_role_code_trgm";"""